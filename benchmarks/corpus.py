@@ -0,0 +1,141 @@
+"""Generate a synthetic corpus of yt-dlp .info.json files.
+
+The corpus covers every shipped extractor config, nests files in
+channel/season directories and mimics real file sizes: most of a YouTube
+info.json is its formats, thumbnails and automatic_captions. A small share
+of files is malformed, lacks an upload_date or is a live chat log.
+
+    python -m benchmarks.corpus /tmp/corpus --files 10000
+"""
+
+import argparse
+import json
+import os
+import random
+
+# yt-dlp extractor names for each shipped config, with their relative share
+EXTRACTORS = [
+    ("youtube", 60),
+    ("youtube:tab", 2),
+    ("twitch:vod", 8),
+    ("twitch:clips", 6),
+    ("vimeo", 6),
+    ("BiliBili", 6),
+    ("zype", 4),
+    ("nebula:video", 7),
+    ("nebula:channel", 1),
+]
+
+_VIDEO_URL = "https://rr3---sn-example.googlevideo.com/videoplayback"
+_CAPTIONS_URL = "https://www.youtube.com/api/timedtext"
+_WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+
+def generate(out_dir, files, seed=0, malformed=0.005, missing_date=0.02, live_chat=0.01):
+    rng = random.Random(seed)
+    names, weights = zip(*EXTRACTORS)
+    stats = {"files": 0, "bytes": 0, "malformed": 0, "live_chat": 0}
+
+    for i in range(files):
+        extractor = rng.choices(names, weights)[0]
+        info = _info(rng, i, extractor, missing_date)
+        channel_dir = os.path.join(out_dir, f"channel_{i % 97:02d}", f"season_{i % 7}")
+        os.makedirs(channel_dir, exist_ok=True)
+        base = os.path.join(channel_dir, f"video_{i:07d} [{info['id']}]")
+
+        data = json.dumps(info, ensure_ascii=False).encode("utf-8")
+        if rng.random() < malformed:
+            data = data[: rng.randrange(1, len(data))]
+            stats["malformed"] += 1
+        with open(f"{base}.info.json", "wb") as f:
+            f.write(data)
+        stats["files"] += 1
+        stats["bytes"] += len(data)
+
+        if rng.random() < live_chat:
+            chat = [{"replayChatItemAction": {"message": _text(rng, 8)}} for _ in range(20)]
+            with open(f"{base}.live_chat.json", "w", encoding="utf-8") as f:
+                f.write("\n".join(json.dumps(line) for line in chat))
+            stats["live_chat"] += 1
+
+    return stats
+
+
+def _info(rng, i, extractor, missing_date):
+    video_id = f"{i:011x}"
+    info = {
+        "id": video_id,
+        "title": _text(rng, rng.randint(3, 12)).title(),
+        "fulltitle": _text(rng, 6),
+        "description": _text(rng, int(rng.lognormvariate(4.5, 1.0))),
+        "uploader": f"Channel {i % 97}",
+        "creator": f"Creator {i % 53}",
+        "channel_id": f"UC{i % 97:022d}",
+        "upload_date": f"20{rng.randint(10, 25)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+        "modified_date": "20240101",
+        "epoch": 1700000000 + i,
+        "duration": rng.randint(30, 7200),
+        "view_count": rng.randint(0, 10**7),
+        "categories": rng.sample(["Music", "Gaming", "Education", "Comedy", "News"], 2),
+        "tags": [_text(rng, 2) for _ in range(rng.randint(0, 40))],
+        "extractor": extractor,
+        "extractor_key": extractor.split(":")[0].title().replace("Bilibili", "BiliBili"),
+        "_filename": f"video_{i:07d} [{video_id}].mp4",
+    }
+    if rng.random() < missing_date:
+        del info["upload_date"]
+
+    # Bulky containers, sized to give YouTube files of roughly 200 KB to 2 MB
+    fat = extractor.startswith("youtube")
+    info["formats"] = [_format(rng, n) for n in range(rng.randint(50, 350) if fat else 8)]
+    info["requested_formats"] = info["formats"][-2:]
+    info["thumbnails"] = [
+        {"url": f"https://i.ytimg.com/vi/{video_id}/{n}.jpg", "preference": -n, "id": str(n)}
+        for n in range(40 if fat else 3)
+    ]
+    if fat:
+        info["automatic_captions"] = {
+            f"lang{n}": [
+                {"ext": ext, "url": f"{_CAPTIONS_URL}?v={video_id}&fmt={ext}&{'x' * 200}"}
+                for ext in ("json3", "srv1", "srv2", "srv3", "ttml", "vtt")
+            ]
+            for n in range(rng.randint(0, 150))
+        }
+        info["subtitles"] = {}
+    if extractor in ("youtube:tab", "nebula:channel"):
+        info["entries"] = [{"id": f"{n:011x}", "title": _text(rng, 5)} for n in range(50)]
+    return info
+
+
+def _format(rng, n):
+    return {
+        "format_id": str(n),
+        "url": f"{_VIDEO_URL}?{'x' * rng.randint(1000, 2000)}",
+        "ext": rng.choice(["mp4", "webm", "m4a"]),
+        "width": rng.choice([256, 640, 1280, 1920]),
+        "height": rng.choice([144, 360, 720, 1080]),
+        "tbr": rng.random() * 5000,
+        "protocol": "https",
+        "http_headers": {"User-Agent": "Mozilla/5.0", "Accept": "*/*"},
+        "fragments": [{"url": f"sq/{k}", "duration": 5.0} for k in range(rng.randint(0, 80))],
+    }
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic .info.json corpus")
+    parser.add_argument("out_dir", help="Directory to write the corpus to")
+    parser.add_argument("-n", "--files", type=int, default=10000, help="Number of info.json files")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--malformed", type=float, default=0.005, help="Share of broken files")
+    args = parser.parse_args()
+
+    stats = generate(args.out_dir, args.files, args.seed, args.malformed)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Benchmark ytdl-nfo against a corpus and report machine-readable results.
+
+Runs the CLI end to end in subprocesses (fresh conversion, rerun without
+--overwrite and rerun with --overwrite) and times each stage of the
+conversion engine in-process. Results are written as JSON; --compare
+checks them against an earlier result file and fails on regressions.
+
+    python -m benchmarks.corpus /tmp/corpus --files 10000
+    python -m benchmarks.run /tmp/corpus --output results.json
+    python -m benchmarks.run /tmp/corpus --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+from ytdl_nfo.jsonload import loads
+from ytdl_nfo.nfo import load_config, resolve_extractor, to_xml
+
+STAGES = ["walk", "read", "decode", "render", "serialize", "write"]
+
+
+def bench_cli(corpus, jobs=1):
+    results = {}
+    _remove_nfos(corpus)
+    results["convert"] = _run_cli(corpus, jobs)
+    results["rerun"] = _run_cli(corpus, jobs)
+    results["overwrite"] = _run_cli(corpus, jobs, "--overwrite")
+    return results
+
+
+def bench_engine(corpus):
+    # Time each stage of a conversion separately, writing to a scratch directory
+    timings = dict.fromkeys(STAGES, 0.0)
+    counts = {"files": 0, "failed": 0, "bytes_read": 0, "bytes_written": 0}
+
+    start = time.perf_counter()
+    paths = [
+        os.path.join(root, file_name)
+        for root, dirs, files in os.walk(corpus)
+        for file_name in files
+        if file_name.endswith(".info.json")
+    ]
+    timings["walk"] = time.perf_counter() - start
+
+    out_dir = tempfile.mkdtemp(prefix="ytdl-nfo-bench-")
+    try:
+        for n, path in enumerate(paths):
+            counts["files"] += 1
+            t0 = time.perf_counter()
+            with open(path, "rb") as f:
+                raw = f.read()
+            t1 = time.perf_counter()
+            counts["bytes_read"] += len(raw)
+            try:
+                data = loads(raw)
+                extractor = resolve_extractor(data)
+                template = load_config(extractor, path).template if extractor else None
+                if template is None:
+                    raise ValueError(f"No usable config for {extractor}")
+                t2 = time.perf_counter()
+                top = template.render(data)
+            except ValueError:
+                counts["failed"] += 1
+                timings["read"] += t1 - t0
+                continue
+            t3 = time.perf_counter()
+            output = to_xml(top).encode("utf-8")
+            t4 = time.perf_counter()
+            with open(os.path.join(out_dir, f"{n}.nfo"), "wb") as f:
+                f.write(output)
+            t5 = time.perf_counter()
+            counts["bytes_written"] += len(output)
+
+            timings["read"] += t1 - t0
+            timings["decode"] += t2 - t1
+            timings["render"] += t3 - t2
+            timings["serialize"] += t4 - t3
+            timings["write"] += t5 - t4
+    finally:
+        shutil.rmtree(out_dir)
+
+    total = sum(timings.values())
+    return {
+        **counts,
+        "seconds": total,
+        "files_per_sec": counts["files"] / total if total else 0.0,
+        "stages": timings,
+        "peak_rss_bytes": _maxrss(resource.getrusage(resource.RUSAGE_SELF)),
+    }
+
+
+def compare(current, baseline, threshold):
+    # Return (metric, baseline, current) for throughputs that dropped too far
+    regressions = []
+    for name, value in _throughputs(current).items():
+        old = _throughputs(baseline).get(name)
+        if old and value < old * (1 - threshold):
+            regressions.append((name, old, value))
+    return regressions
+
+
+def _run_cli(corpus, jobs, *options):
+    files = sum(1 for _ in _info_files(corpus))
+    command = [sys.executable, "-m", "ytdl_nfo", "--jobs", str(jobs), *options, corpus]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    # wait4 reports the resource usage of this child alone
+    _, status, rusage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        "files": files,
+        "seconds": seconds,
+        "files_per_sec": files / seconds,
+        "exit_code": process.returncode,
+        "peak_rss_bytes": _maxrss(rusage),
+    }
+
+
+def _info_files(corpus):
+    for root, dirs, files in os.walk(corpus):
+        for file_name in files:
+            if file_name.endswith(".info.json"):
+                yield os.path.join(root, file_name)
+
+
+def _remove_nfos(corpus):
+    for root, dirs, files in os.walk(corpus):
+        for file_name in files:
+            if file_name.endswith(".nfo"):
+                os.remove(os.path.join(root, file_name))
+
+
+def _maxrss(rusage):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+
+
+def _throughputs(results):
+    metrics = {"engine": results["engine"]["files_per_sec"]}
+    for name, run in results.get("cli", {}).items():
+        metrics[f"cli.{name}"] = run["files_per_sec"]
+    return metrics
+
+
+def _version():
+    try:
+        return metadata.version("ytdl-nfo")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ytdl-nfo on a corpus")
+    parser.add_argument("corpus", help="Corpus directory from benchmarks.corpus")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Jobs for the CLI runs")
+    parser.add_argument("--engine-only", action="store_true", help="Skip the CLI runs")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", metavar="JSON", help="Earlier results to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="Allowed throughput drop for --compare"
+    )
+    args = parser.parse_args()
+
+    results = {
+        "version": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    # Linux children inherit the parent's peak RSS, so run them before the
+    # in-process benchmark has loaded any corpus data
+    if not args.engine_only:
+        results["cli"] = bench_cli(args.corpus, args.jobs)
+    results["engine"] = bench_engine(args.corpus)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            message = f"Regression: {name} dropped from {old:.1f} to {new:.1f} files/s"
+            print(message, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
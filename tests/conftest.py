@@ -6,6 +6,14 @@ from pathlib import Path
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def config_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep parsed config caches out of the user's cache directory."""
+    cache_dir = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("YTDL_NFO_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
 @pytest.fixture
 def fixtures_dir():
     """Return path to fixtures directory."""
@@ -47,3 +55,13 @@ def temp_json_file(tmp_path, sample_youtube_json_data):
     with open(json_file, "w", encoding="utf-8") as f:
         json.dump(sample_youtube_json_data, f)
     return json_file
+
+
+@pytest.fixture
+def json_backend():
+    """Return a function forcing the JSON backend, restored after the test."""
+    from ytdl_nfo import jsonload
+
+    saved = jsonload._backend, jsonload._backend_loads
+    yield jsonload.set_backend
+    jsonload._backend, jsonload._backend_loads = saved
@@ -0,0 +1,182 @@
+"""Tests for atomic and durable NFO writes."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ytdl_nfo import atomic
+from ytdl_nfo.nfo import write_if_changed
+from ytdl_nfo.parallel import WRITTEN, Result
+
+
+@pytest.fixture
+def staging():
+    """Stage writes for the duration of a test."""
+    atomic.enable()
+    yield
+    atomic.disable()
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    """Record the paths passed to fsync."""
+    synced = []
+    fsync = os.fsync
+
+    def record(fd):
+        synced.append(os.readlink(f"/proc/self/fd/{fd}"))
+        fsync(fd)
+
+    monkeypatch.setattr(atomic.os, "fsync", record)
+    return synced
+
+
+def temp_files(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+
+@pytest.mark.unit
+class TestWriteFile:
+    """Test writing through a temporary file."""
+
+    def test_replaces_target(self, tmp_path):
+        """Test that the target is replaced and no temporary file is left."""
+        target = tmp_path / "video.nfo"
+        target.write_bytes(b"old")
+
+        assert write_if_changed(str(target), b"new") is True
+        assert target.read_bytes() == b"new"
+        assert temp_files(tmp_path) == []
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX permissions")
+    def test_keeps_permissions(self, tmp_path):
+        """Test that a replaced NFO keeps its permissions."""
+        target = tmp_path / "video.nfo"
+        target.write_bytes(b"old")
+        target.chmod(0o640)
+
+        write_if_changed(str(target), b"new")
+
+        assert target.stat().st_mode & 0o777 == 0o640
+
+    def test_failed_write_cleaned_up(self, tmp_path, monkeypatch):
+        """Test that the temporary file is removed when writing fails."""
+
+        def fail(*args):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(atomic.os, "chmod", fail)
+        target = tmp_path / "video.nfo"
+        target.write_bytes(b"old")
+
+        with pytest.raises(OSError):
+            write_if_changed(str(target), b"new")
+        assert target.read_bytes() == b"old"
+        assert temp_files(tmp_path) == []
+
+
+@pytest.mark.unit
+class TestDurableWrites:
+    """Test staging writes and committing them in batches."""
+
+    def test_staged_until_synced(self, tmp_path, staging):
+        """Test that staged NFOs only replace their targets once synced."""
+        target = tmp_path / "video.nfo"
+        target.write_bytes(b"old")
+
+        write_if_changed(str(target), b"new")
+        assert target.read_bytes() == b"old"
+
+        atomic.sync(atomic.drain())
+        assert target.read_bytes() == b"new"
+        assert temp_files(tmp_path) == []
+
+    @pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+    def test_directories_synced_once(self, tmp_path, staging, fsyncs):
+        """Test that every file is flushed but each directory only once."""
+        for name in ("a", "b", "c"):
+            write_if_changed(str(tmp_path / f"{name}.nfo"), name.encode())
+
+        atomic.sync(atomic.drain())
+
+        assert fsyncs.count(str(tmp_path)) == 1
+        assert len(fsyncs) == 4
+
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX permissions")
+    def test_read_only_target(self, tmp_path, staging):
+        """Test that a read-only NFO is replaced and keeps its mode."""
+        target = tmp_path / "video.nfo"
+        target.write_bytes(b"old")
+        target.chmod(0o444)
+
+        write_if_changed(str(target), b"new")
+
+        assert atomic.sync(atomic.drain()) == set()
+        assert target.read_bytes() == b"new"
+        assert target.stat().st_mode & 0o777 == 0o444
+        assert temp_files(tmp_path) == []
+
+    def test_failed_file_does_not_abort_batch(self, tmp_path, staging, monkeypatch, caplog):
+        """Test that one file failing to sync leaves the rest of the batch in place."""
+        fsync = atomic._fsync
+
+        def fail_bad(path, *args):
+            if ".bad.nfo." in path:
+                return OSError("I/O error")
+            return fsync(path, *args)
+
+        monkeypatch.setattr(atomic, "_fsync", fail_bad)
+        batch = atomic.Batch()
+        for name in ("good", "bad"):
+            write_if_changed(str(tmp_path / f"{name}.nfo"), name.encode())
+            batch.add(Result(f"{name}.info.json", WRITTEN, "record", staged=atomic.drain()))
+
+        results = batch.commit()
+
+        assert (tmp_path / "good.nfo").read_bytes() == b"good"
+        assert not (tmp_path / "bad.nfo").exists()
+        assert temp_files(tmp_path) == []
+        assert [result.record for result in results] == ["record", None]
+        assert "Failed to write" in caplog.text
+
+    def test_batch_holds_results(self, tmp_path, staging):
+        """Test that results are handed back once their batch is committed."""
+        batch = atomic.Batch(size=2)
+        write_if_changed(str(tmp_path / "a.nfo"), b"a")
+        first = Result("a.info.json", WRITTEN, None)
+
+        assert batch.add(first) == []
+        assert not (tmp_path / "a.nfo").exists()
+
+        # Worker processes return their staged files with the result
+        write_if_changed(str(tmp_path / "b.nfo"), b"b")
+        second = Result("b.info.json", WRITTEN, None, staged=atomic.drain())
+        assert batch.add(second) == [first, second]
+        assert (tmp_path / "a.nfo").read_bytes() == b"a"
+        assert (tmp_path / "b.nfo").read_bytes() == b"b"
+
+
+@pytest.mark.integration
+class TestCli:
+    """Test durable runs from the command line."""
+
+    @pytest.mark.parametrize("mode", [[], ["-j", "2"], ["--io-concurrency", "4"]])
+    def test_fsync(self, tmp_path, sample_youtube_json_data, mode):
+        """Test that durable runs write every NFO and leave no temporary files."""
+        for i in range(5):
+            data = dict(sample_youtube_json_data, id=f"video{i}")
+            (tmp_path / f"video{i}.info.json").write_text(json.dumps(data), encoding="utf-8")
+        manifest = tmp_path / "manifest.db"
+
+        subprocess.run(
+            [sys.executable, "-m", "ytdl_nfo", "--fsync", "-m", str(manifest), *mode]
+            + [str(tmp_path)],
+            capture_output=True,
+            check=True,
+        )
+
+        assert len(list(tmp_path.glob("*.nfo"))) == 5
+        assert temp_files(tmp_path) == []
@@ -0,0 +1,39 @@
+"""Smoke tests for the benchmark harness."""
+
+import os
+
+import pytest
+
+from benchmarks.corpus import EXTRACTORS, generate
+from benchmarks.run import STAGES, bench_engine, compare
+from ytdl_nfo import get_config_path
+from ytdl_nfo.nfo import extractor_name
+
+
+@pytest.mark.integration
+class TestBenchmarks:
+    """Test corpus generation and the engine benchmark."""
+
+    def test_generate_and_bench(self, tmp_path):
+        """Test that a generated corpus can be benchmarked."""
+        stats = generate(str(tmp_path), 30, seed=1, malformed=0.1)
+
+        results = bench_engine(str(tmp_path))
+
+        assert stats["files"] == results["files"] == 30
+        assert results["failed"] >= stats["malformed"]
+        assert results["files"] - results["failed"] > 0
+        assert set(results["stages"]) == set(STAGES)
+
+    def test_every_config_covered(self):
+        """Test that every shipped config except the test one is generated."""
+        configs = {name[:-5] for name in os.listdir(get_config_path())} - {"test"}
+
+        assert {extractor_name({"extractor": name}) for name, _ in EXTRACTORS} == configs
+
+    def test_compare_flags_regressions(self):
+        """Test that throughput drops beyond the threshold are reported."""
+        baseline = {"engine": {"files_per_sec": 100.0}, "cli": {"rerun": {"files_per_sec": 10.0}}}
+        current = {"engine": {"files_per_sec": 80.0}, "cli": {"rerun": {"files_per_sec": 9.5}}}
+
+        assert compare(current, baseline, 0.1) == [("engine", 100.0, 80.0)]
@@ -0,0 +1,102 @@
+"""Tests for the parsed config cache."""
+
+import os
+
+import pytest
+
+from ytdl_nfo import configcache
+from ytdl_nfo.configcache import CACHE_ENV, cache_dir, load_yaml, parse_yaml
+from ytdl_nfo.nfo import clear_config_cache, load_config
+
+CONFIG = "movie:\n  - title: '{title}'\n"
+
+
+def entries(config_cache_dir):
+    return sorted(os.listdir(config_cache_dir / "configs"))
+
+
+@pytest.mark.unit
+class TestLoadYaml:
+    """Test loading configs through the cache."""
+
+    def test_cached_after_first_load(self, tmp_path, config_cache_dir, monkeypatch):
+        """Test that a second load reads the cache instead of the YAML."""
+        config_file = tmp_path / "custom.yaml"
+        config_file.write_text(CONFIG, encoding="utf-8")
+        first = load_yaml(str(config_file))
+
+        def fail(source):
+            raise AssertionError("YAML parsed again")
+
+        monkeypatch.setattr(configcache, "parse_yaml", fail)
+
+        assert load_yaml(str(config_file)) == first
+        assert first == parse_yaml(CONFIG)
+        assert len(entries(config_cache_dir)) == 1
+
+    def test_modified_source_reparsed(self, tmp_path):
+        """Test that an edited config falls back to its YAML."""
+        config_file = tmp_path / "custom.yaml"
+        config_file.write_text(CONFIG, encoding="utf-8")
+        load_yaml(str(config_file))
+
+        config_file.write_text(CONFIG + "  - plot: '{description}'\n", encoding="utf-8")
+        data, _ = load_yaml(str(config_file))
+
+        assert data["movie"][1] == {"plot": "{description}"}
+
+    def test_corrupt_entry_ignored(self, tmp_path, config_cache_dir):
+        """Test that an unreadable cache entry is replaced."""
+        config_file = tmp_path / "custom.yaml"
+        config_file.write_text(CONFIG, encoding="utf-8")
+        load_yaml(str(config_file))
+        entry = config_cache_dir / "configs" / entries(config_cache_dir)[0]
+        entry.write_text("{", encoding="utf-8")
+
+        assert load_yaml(str(config_file)) == parse_yaml(CONFIG)
+
+    def test_unrepresentable_config_not_cached(self, tmp_path, config_cache_dir):
+        """Test that configs JSON cannot round trip stay uncached."""
+        config_file = tmp_path / "custom.yaml"
+        config_file.write_text("movie:\n  - 1: 2020-01-01\n", encoding="utf-8")
+
+        load_yaml(str(config_file))
+
+        assert not (config_cache_dir / "configs").exists()
+
+    def test_missing_config(self, tmp_path):
+        """Test that a missing config raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            load_yaml(str(tmp_path / "missing.yaml"))
+
+    def test_cache_disabled(self, tmp_path, monkeypatch):
+        """Test that an empty cache directory setting disables caching."""
+        monkeypatch.setenv(CACHE_ENV, "")
+        config_file = tmp_path / "custom.yaml"
+        config_file.write_text(CONFIG, encoding="utf-8")
+
+        assert cache_dir() is None
+        assert load_yaml(str(config_file)) == parse_yaml(CONFIG)
+
+    def test_default_cache_dir(self, monkeypatch):
+        """Test that the cache follows XDG_CACHE_HOME."""
+        monkeypatch.delenv(CACHE_ENV)
+        monkeypatch.setenv("XDG_CACHE_HOME", "/var/cache/user")
+
+        assert cache_dir() == os.path.join("/var/cache/user", "ytdl-nfo")
+
+
+@pytest.mark.unit
+class TestBundledConfigs:
+    """Test that bundled configs use the cache."""
+
+    def test_bundled_config_cached(self, config_cache_dir):
+        """Test that a bundled config loads the same from YAML and cache."""
+        clear_config_cache()
+        from_yaml = load_config("youtube")
+        clear_config_cache()
+        from_cache = load_config("youtube")
+
+        assert from_cache.data == from_yaml.data
+        assert from_cache.fingerprint == from_yaml.fingerprint
+        assert entries(config_cache_dir)[0].endswith("-youtube.yaml.json")
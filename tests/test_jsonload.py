@@ -0,0 +1,83 @@
+"""Tests for JSON loading backends."""
+
+import importlib.util
+import json
+import math
+import sys
+
+import pytest
+
+from ytdl_nfo import jsonload
+from ytdl_nfo.jsonload import BACKEND_ENV, BACKENDS, loads
+
+INSTALLED = [name for name in BACKENDS if importlib.util.find_spec(name) is not None]
+
+
+@pytest.fixture
+def info_json():
+    """Return an info.json document with bulky containers."""
+    return json.dumps(
+        {
+            "id": "abc",
+            "title": "Title \"quoted\" \\u00fc",
+            "view_count": 10,
+            "categories": ["Music"],
+            "formats": [{"format_id": "18", "url": "https://example.com/{x}"}],
+            "thumbnails": [{"url": "https://example.com/t.jpg"}],
+            "is_live": False,
+            "release_date": None,
+        },
+        indent=2,
+    ).encode("utf-8")
+
+
+@pytest.mark.unit
+class TestBackends:
+    """Test selecting and using a JSON backend."""
+
+    def test_auto_picks_fastest_installed(self, json_backend, monkeypatch):
+        """Test that the first installed backend is picked."""
+        monkeypatch.delenv(BACKEND_ENV, raising=False)
+        jsonload._backend = None
+
+        assert jsonload.backend() == INSTALLED[0]
+
+    def test_environment_variable(self, json_backend, monkeypatch):
+        """Test that the environment variable forces a backend."""
+        monkeypatch.setenv(BACKEND_ENV, "json")
+        jsonload._backend = None
+
+        assert jsonload.backend() == "json"
+
+    def test_unknown_backend(self, json_backend):
+        """Test that unknown backend names are rejected."""
+        with pytest.raises(ValueError, match="Unknown JSON backend"):
+            json_backend("simdjson")
+
+    def test_missing_backend(self, json_backend, monkeypatch):
+        """Test that forcing a backend that is not installed fails."""
+        monkeypatch.setitem(sys.modules, "msgspec", None)
+
+        with pytest.raises(ImportError):
+            json_backend("msgspec")
+
+    @pytest.mark.parametrize("name", INSTALLED)
+    def test_same_results(self, json_backend, info_json, name):
+        """Test that every backend decodes like the json module."""
+        json_backend(name)
+
+        assert loads(info_json) == json.loads(info_json)
+        assert math.isnan(loads(b'{"a": NaN}')["a"])
+
+    @pytest.mark.parametrize("name", INSTALLED)
+    @pytest.mark.parametrize("raw", [b"", b'{"a": 1,}', b'{"a": 1} x', b"\xff"])
+    def test_same_errors(self, json_backend, name, raw):
+        """Test that malformed documents raise the json module's error."""
+        json_backend(name)
+        with pytest.raises(ValueError) as expected:
+            json.loads(raw)
+
+        with pytest.raises(type(expected.value)) as error:
+            loads(raw)
+
+        assert str(error.value) == str(expected.value)
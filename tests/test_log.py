@@ -0,0 +1,181 @@
+"""Tests for logging and the run summary."""
+
+import io
+import json
+import logging
+import subprocess
+import sys
+
+import pytest
+
+from ytdl_nfo import log
+from ytdl_nfo.parallel import FAILED, UNCHANGED, WRITTEN, Result, run_parallel
+
+
+def run_cli(*args):
+    return subprocess.run(
+        [sys.executable, "-m", "ytdl_nfo", *map(str, args)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+@pytest.fixture
+def videos(tmp_path, sample_youtube_json_data):
+    """Write two convertible videos, a broken file and one without a config."""
+    for i in range(2):
+        data = dict(sample_youtube_json_data, id=f"video{i}")
+        (tmp_path / f"video{i}.info.json").write_text(json.dumps(data), encoding="utf-8")
+    (tmp_path / "broken.info.json").write_text("{", encoding="utf-8")
+    unknown = dict(sample_youtube_json_data, extractor="unknown_site")
+    (tmp_path / "unknown.info.json").write_text(json.dumps(unknown), encoding="utf-8")
+    return tmp_path
+
+
+class FakeConsole:
+    tty = True
+
+    def __init__(self):
+        self.lines = []
+
+    def status(self, line):
+        self.lines.append(line)
+
+    def end_status(self):
+        pass
+
+
+@pytest.mark.unit
+class TestRunSummary:
+    """Test counting results and aggregating failures."""
+
+    def test_failures_aggregated(self, caplog):
+        """Test that failures are summarized by kind and extractor."""
+        caplog.set_level(logging.INFO, logger="ytdl_nfo")
+        summary = log.RunSummary()
+        summary.add(Result("a", WRITTEN, None, "youtube"))
+        summary.add(Result("b", UNCHANGED, None, "youtube"))
+        summary.add(Result("c", FAILED, None, "youtube", "render"))
+        summary.add(Result("d", FAILED, None, "vimeo", "render"))
+        summary.add(Result("e", FAILED, None, "vimeo", "render"))
+        summary.add(Result("f", FAILED, None, None, "json"))
+
+        summary.finish()
+
+        assert caplog.messages == [
+            "1 written, 1 unchanged, 4 failed",
+            "json errors: 1 (unknown 1)",
+            "render errors: 3 (vimeo 2, youtube 1)",
+        ]
+
+    def test_progress(self, monkeypatch):
+        """Test the progress line's count, rate and time left."""
+        console = FakeConsole()
+        summary = log.RunSummary(4, console)
+        monkeypatch.setattr(log.time, "monotonic", lambda: summary.started + 2)
+
+        summary.add(Result("a", WRITTEN, None, "youtube"))
+        summary.add(Result("b", FAILED, None, "youtube", "render"))
+
+        assert console.lines == ["1/4 files (25%), 0 files/s, ETA 0:00:06"]
+        assert summary.progress(summary.started + 2) == (
+            "2/4 files (50%), 1 files/s, ETA 0:00:02, 1 failed"
+        )
+
+
+@pytest.mark.unit
+class TestHandlers:
+    """Test the console and JSON lines handlers."""
+
+    def test_console_buffered(self, monkeypatch):
+        """Test that info records wait for the flush interval and errors do not."""
+        flushes = []
+        stream = io.StringIO()
+        monkeypatch.setattr(stream, "flush", lambda: flushes.append(stream.getvalue()))
+        handler = log._BufferedHandler(stream)
+        logger = logging.getLogger("ytdl_nfo.test")
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        try:
+            logger.info("first")
+            logger.info("second")
+            assert flushes == []
+
+            logger.error("failed")
+            assert flushes == ["first\nsecond\nfailed\n"]
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(logging.NOTSET)
+
+    def test_json_lines(self):
+        """Test that records are written as JSON with their extra fields."""
+        record = logging.LogRecord("ytdl_nfo", logging.ERROR, "", 0, "bad %s", ("file",), None)
+        record.path = "a.info.json"
+        record.kind = "json"
+
+        entry = json.loads(log._JsonFormatter().format(record))
+
+        assert entry["level"] == "error"
+        assert entry["message"] == "bad file"
+        assert entry["path"] == "a.info.json"
+        assert entry["kind"] == "json"
+        assert "extractor" not in entry
+
+    def test_worker_records_replayed(self, videos, caplog):
+        """Test that errors logged in worker processes reach the parent."""
+        paths = sorted(str(path) for path in videos.glob("*.info.json"))
+
+        results = list(run_parallel(paths, 2))
+
+        assert [result.error for result in results] == ["json", "config", None, None]
+        assert "Failed to parse JSON in file" in caplog.text
+        assert all(result.logs is None for result in results)
+
+
+@pytest.mark.integration
+class TestCli:
+    """Test the logging options of the command line."""
+
+    def test_default_output(self, videos):
+        """Test that files are not listed but errors and the summary are."""
+        result = run_cli(videos)
+
+        assert "Processed" not in result.stderr
+        assert "Error: Failed to parse JSON in file" in result.stderr
+        assert "2 written, 0 unchanged, 2 failed" in result.stderr
+        assert "config errors: 1 (unknown_site 1)" in result.stderr
+        assert result.stdout == ""
+
+    def test_verbose(self, videos):
+        """Test that verbose runs list every file."""
+        result = run_cli("-v", videos)
+
+        assert result.stderr.count("Processed") == 4
+
+    def test_quiet(self, videos):
+        """Test that quiet runs only report the failure summary."""
+        result = run_cli("-q", videos)
+
+        assert result.stderr.splitlines() == [
+            "config errors: 1 (unknown_site 1)",
+            "json errors: 1 (unknown 1)",
+        ]
+
+    def test_progress(self, videos):
+        """Test that the progress line is written when output is not a terminal."""
+        result = run_cli("-q", "--progress", videos)
+
+        assert "4/4 files (100%)" in result.stderr
+
+    def test_log_json(self, videos, tmp_path):
+        """Test that the JSON lines log records every file."""
+        log_file = tmp_path / "log.jsonl"
+
+        run_cli("-q", "--log-json", log_file, "-j", "2", videos)
+
+        entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+        processed = [entry for entry in entries if entry["message"].startswith("Processed")]
+        assert sorted(entry["status"] for entry in processed) == [FAILED, FAILED, WRITTEN, WRITTEN]
+        assert {entry.get("kind") for entry in processed} == {None, "json", "config"}
+        assert entries[-1]["level"] == "warning"
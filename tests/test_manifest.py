@@ -0,0 +1,131 @@
+"""Tests for the incremental conversion manifest."""
+
+import json
+import os
+
+import pytest
+
+from ytdl_nfo.manifest import Manifest
+from ytdl_nfo.nfo import clear_config_cache
+from ytdl_nfo.parallel import convert_file
+from ytdl_nfo.Ytdl_nfo import Target
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    """Open a manifest in a temporary directory."""
+    with Manifest(str(tmp_path / "manifest.db")) as manifest:
+        yield manifest
+
+
+def convert(manifest, path, config_dir=None, targets=()):
+    record = convert_file(str(path), config_dir=config_dir, track=True, targets=targets).record
+    manifest.record(str(path), record)
+
+
+def bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.unit
+class TestManifest:
+    """Test change detection for converted inputs."""
+
+    def test_untracked_file_not_current(self, manifest, temp_json_file):
+        """Test that files missing from the manifest need converting."""
+        assert manifest.is_current(str(temp_json_file)) is False
+
+    def test_converted_file_current(self, manifest, temp_json_file):
+        """Test that unchanged inputs are current after conversion."""
+        convert(manifest, temp_json_file)
+
+        assert manifest.is_current(str(temp_json_file)) is True
+
+    def test_modified_input_not_current(self, manifest, temp_json_file, sample_youtube_json_data):
+        """Test that edited inputs are picked up again."""
+        convert(manifest, temp_json_file)
+        data = dict(sample_youtube_json_data, title="Edited")
+        temp_json_file.write_text(json.dumps(data), encoding="utf-8")
+        bump_mtime(temp_json_file)
+
+        assert manifest.is_current(str(temp_json_file)) is False
+
+    def test_missing_nfo_not_current(self, manifest, temp_json_file):
+        """Test that deleted NFOs are regenerated."""
+        convert(manifest, temp_json_file)
+        os.remove(str(temp_json_file)[:-10] + ".nfo")
+
+        assert manifest.is_current(str(temp_json_file)) is False
+
+    def test_config_change_not_current(self, manifest, tmp_path, temp_json_file):
+        """Test that changing the extractor config invalidates entries."""
+        config_dir = tmp_path / "configs"
+        config_dir.mkdir()
+        config = config_dir / "youtube.yaml"
+        config.write_text("movie:\n  - title: '{title}'\n")
+        convert(manifest, temp_json_file, str(config_dir))
+
+        config.write_text("movie:\n  - title: '{title}'\n  - plot: '{description}'\n")
+        bump_mtime(config)
+
+        assert manifest.is_current(str(temp_json_file), str(config_dir)) is False
+        clear_config_cache()
+
+    def test_touched_input_current_with_hashes(self, tmp_path, temp_json_file):
+        """Test that content hashes ignore mtime-only changes."""
+        with Manifest(str(tmp_path / "hashed.db"), hash_inputs=True) as manifest:
+            record = convert_file(str(temp_json_file), track=True, hash_inputs=True).record
+            manifest.record(str(temp_json_file), record)
+            bump_mtime(temp_json_file)
+
+            assert manifest.is_current(str(temp_json_file)) is True
+
+    def test_unreadable_input_not_current(self, tmp_path, temp_json_file, monkeypatch):
+        """Test that inputs failing to hash are converted again instead of raising."""
+
+        def deny(file_path):
+            raise PermissionError(file_path)
+
+        with Manifest(str(tmp_path / "hashed.db"), hash_inputs=True) as manifest:
+            record = convert_file(str(temp_json_file), track=True, hash_inputs=True).record
+            manifest.record(str(temp_json_file), record)
+            bump_mtime(temp_json_file)
+            monkeypatch.setattr("ytdl_nfo.manifest.hash_file", deny)
+
+            assert manifest.is_current(str(temp_json_file)) is False
+
+    def test_persists_between_runs(self, tmp_path, temp_json_file):
+        """Test that entries survive closing the manifest."""
+        db = str(tmp_path / "manifest.db")
+        with Manifest(db) as manifest:
+            convert(manifest, temp_json_file)
+
+        with Manifest(db) as manifest:
+            assert manifest.is_current(str(temp_json_file)) is True
+
+    def test_targets(self, manifest, tmp_path, temp_json_file):
+        """Test that target configs, names and NFOs are tracked."""
+        config_dir = tmp_path / "jellyfin"
+        config_dir.mkdir()
+        config = config_dir / "youtube.yaml"
+        config.write_text("movie:\n  - title: '{title}'\n")
+        targets = [Target("jellyfin", str(config_dir))]
+        convert(manifest, temp_json_file, targets=targets)
+
+        assert manifest.is_current(str(temp_json_file), targets=targets) is True
+        assert manifest.is_current(str(temp_json_file)) is False
+        assert manifest.is_current(str(temp_json_file), targets=[Target("kodi", None)]) is False
+
+        config.write_text("movie:\n  - title: '{title}'\n  - plot: '{description}'\n")
+        bump_mtime(config)
+        assert manifest.is_current(str(temp_json_file), targets=targets) is False
+        clear_config_cache()
+
+    def test_missing_target_nfo_not_current(self, manifest, temp_json_file):
+        """Test that a deleted target NFO is regenerated."""
+        targets = [Target("jellyfin", None)]
+        convert(manifest, temp_json_file, targets=targets)
+        os.remove(str(temp_json_file)[:-10] + ".jellyfin.nfo")
+
+        assert manifest.is_current(str(temp_json_file), targets=targets) is False
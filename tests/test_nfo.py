@@ -1,9 +1,21 @@
 """Tests for Nfo class."""
 
+import os
+import sys
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
 
 import pytest
 
-from ytdl_nfo.nfo import Nfo
+from ytdl_nfo.nfo import (
+    Nfo,
+    Template,
+    clear_config_cache,
+    config_cache_info,
+    load_config,
+    resolve_extractor,
+    to_xml,
+)
 
 
 @pytest.mark.unit
@@ -99,3 +111,315 @@ class TestNfoGeneration:
         assert "<?xml" in xml_string
         assert "<episodedetails>" in xml_string
         assert "</episodedetails>" in xml_string
+
+
+@pytest.mark.unit
+class TestTemplate:
+    """Test compiled render plans."""
+
+    def test_compiles_nodes_once(self):
+        """Test that config nodes are compiled into an immutable plan."""
+        template = Template({"episodedetails": [{"title": "{title}"}, {"actor>name!": "{cast}"}]})
+
+        assert template.name == "episodedetails"
+        assert isinstance(template.nodes, tuple)
+        assert template.nodes[1].parents == ("actor",)
+        assert template.nodes[1].name == "name"
+
+    def test_invalid_nested_key_rejected_at_compile(self):
+        """Test that > paths without the list flag fail when compiling."""
+        with pytest.raises(ValueError, match="deliminator"):
+            Template({"episodedetails": [{"this>is>invalid": "{title}"}]})
+
+    def test_render_is_repeatable(self, sample_youtube_json_data):
+        """Test that one template renders several records independently."""
+        template = Nfo("youtube", "test.info.json").template
+        other = dict(sample_youtube_json_data, title="Other Title")
+
+        first = template.render(sample_youtube_json_data)
+        second = template.render(other)
+
+        assert first.find("title").text == "Test Video Title"
+        assert second.find("title").text == "Other Title"
+
+    def test_list_values_and_conversion(self):
+        """Test list flagged nodes with nested paths and date conversion."""
+        template = Template(
+            {
+                "episodedetails": [
+                    {"actor>name!": "{cast}"},
+                    {
+                        "aired": {
+                            "convert": "date",
+                            "input_f": "%Y%m%d",
+                            "output_f": "%Y-%m-%d",
+                            "value": "{upload_date}",
+                        }
+                    },
+                ]
+            }
+        )
+        top = template.render({"cast": ["a", "b"], "upload_date": "20230115"})
+
+        assert [e.text for e in top.findall("actor/name")] == ["a", "b"]
+        assert top.find("aired").text == "2023-01-15"
+
+    def test_list_values_native(self):
+        """Test that list fields are iterated without a round trip through text."""
+        template = Template({"episodedetails": [{"tag!": "{tags}"}, {"genre!": "{categories}"}]})
+        tags = ["it's", 'say "hi"', "back\\slash", "]'", 5]
+
+        top = template.render({"tags": tags, "upload_date": "20230115"})
+
+        assert [e.text for e in top.findall("tag")] == [str(tag) for tag in tags]
+        assert top.findall("genre") == []
+
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("{thumbnails[-1][url]}", "https://example.com/large.jpg"),
+            ("{thumbnails[0].url}", "https://example.com/small.jpg"),
+            ("{thumbnails[5][url]}", ""),
+            ("{thumbnails[-1][missing]|none}", "none"),
+            ("{channel_follower_count|0}", "0"),
+            ("{view_count|0}", "0"),
+            ("{view_count}", "None"),
+            ("{like_count:,} likes", "1,234 likes"),
+            ("{title} by {uploader|Unknown}", "Video by Unknown"),
+            ("{title!r} ({thumbnails[0][width]:>4}px)", "'Video' (  10px)"),
+        ],
+    )
+    def test_field_lookups(self, value, expected):
+        """Test nested lookups, defaults and format specs in values."""
+        template = Template({"episodedetails": [{"value": value}]})
+        data = {
+            "title": "Video",
+            "view_count": None,
+            "like_count": 1234,
+            "thumbnails": [
+                {"url": "https://example.com/small.jpg", "width": 10},
+                {"url": "https://example.com/large.jpg", "width": 1000},
+            ],
+            "upload_date": "20230115",
+        }
+
+        assert template.render(data).find("value").text == expected
+
+    def test_list_default(self):
+        """Test that missing lists give their default as a single value."""
+        template = Template({"episodedetails": [{"tag!": "{tags|untagged}"}]})
+
+        top = template.render({"tags": None, "upload_date": "20230115"})
+
+        assert [e.text for e in top.findall("tag")] == ["untagged"]
+
+    def test_lookup_fields(self):
+        """Test that the top level names of lookups are recorded as fields."""
+        template = Template(
+            {"episodedetails": [{"thumb": "{thumbnails[-1][url]}"}, {"n": "{count|0}"}]}
+        )
+
+        assert {"thumbnails", "count"} <= template.fields
+
+    def test_invalid_lookup_rejected(self):
+        """Test that malformed lookups fail when compiling."""
+        with pytest.raises(ValueError, match="invalid lookup"):
+            Template({"episodedetails": [{"thumb": "{thumbnails[-1]x}"}]})
+
+    def test_generate_reports_invalid_config(self):
+        """Test that invalid configs load but fail to generate."""
+        nfo = Nfo("test", "test.info.json")
+
+        assert nfo.config_ok() is True
+        assert nfo.generate({"upload_date": "20230115"}) is False
+        assert nfo.generated_ok() is False
+
+
+@pytest.mark.unit
+class TestConfigCache:
+    """Test the process-wide config cache."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        clear_config_cache()
+        yield
+        clear_config_cache()
+
+    def test_config_parsed_once(self):
+        """Test that repeated lookups reuse the compiled config."""
+        first = Nfo("youtube", "a.info.json")
+        second = Nfo("youtube", "b.info.json")
+
+        assert first.template is second.template
+        info = config_cache_info()
+        assert info.misses == 1
+        assert info.hits == 1
+        assert info.size == 1
+
+    def test_missing_config_cached(self, caplog):
+        """Test that unknown extractors only report an error once."""
+        Nfo("generic", "a.info.json")
+        Nfo("generic", "b.info.json")
+
+        assert caplog.text.count("No config available") == 1
+        info = config_cache_info()
+        assert info.misses == 1
+        assert info.negative_hits == 1
+
+    def test_user_config_dir_override(self, tmp_path):
+        """Test that configs in a user directory take precedence."""
+        (tmp_path / "youtube.yaml").write_text("movie:\n  - title: '{title}'\n")
+
+        nfo = Nfo("youtube", "a.info.json", str(tmp_path))
+
+        assert nfo.template.name == "movie"
+
+    def test_user_config_invalidated_on_change(self, tmp_path):
+        """Test that modified user configs are reloaded."""
+        config = tmp_path / "custom.yaml"
+        config.write_text("movie:\n  - title: '{title}'\n")
+        first = load_config("custom", config_dir=str(tmp_path))
+
+        config.write_text("episodedetails:\n  - title: '{title}'\n  - plot: '{description}'\n")
+        st = config.stat()
+        os.utime(config, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        second = load_config("custom", config_dir=str(tmp_path))
+
+        assert first.template.name == "movie"
+        assert second.template.name == "episodedetails"
+        assert config_cache_info().misses == 2
+
+
+@pytest.mark.unit
+class TestResolveExtractor:
+    """Test mapping extractors to config names."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        clear_config_cache()
+        yield
+        clear_config_cache()
+
+    @pytest.mark.parametrize(
+        "info_dict, expected",
+        [
+            ({"extractor": "youtube"}, "youtube"),
+            ({"extractor": "twitch:vod"}, "twitch_vod"),
+            ({"extractor": "youtube:shorts"}, "youtube"),
+            ({"extractor": "youtube:playlist"}, "youtube_tab"),
+            ({"extractor": "BiliBili"}, "bilibili"),
+            ({"extractor": "unknown", "extractor_key": "TwitchVod"}, "twitch_vod"),
+            ({"extractor_key": "YoutubeTab"}, "youtube_tab"),
+            ({"ie_key": "Youtube", "_type": "url"}, "youtube"),
+            ({"extractor": "generic"}, "generic"),
+            ({}, None),
+        ],
+    )
+    def test_info_dict(self, info_dict, expected):
+        """Test aliases, extractor keys and prefix fallbacks."""
+        assert resolve_extractor(info_dict) == expected
+
+    def test_forced_extractor(self):
+        """Test that explicit extractors use aliases and prefixes but not keys."""
+        assert resolve_extractor({"extractor": "vimeo"}, "twitch:vod") == "twitch_vod"
+        assert resolve_extractor(extractor="nebula:subscriptions") == "nebula_video"
+
+    def test_user_configs(self, tmp_path):
+        """Test that configs added to a user directory are picked up."""
+        info_dict = {"extractor": "youtube:shorts"}
+        assert resolve_extractor(info_dict, config_dir=str(tmp_path)) == "youtube"
+
+        (tmp_path / "youtube_shorts.yaml").write_text("movie:\n  - title: '{title}'\n")
+        st = tmp_path.stat()
+        os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        assert resolve_extractor(info_dict, config_dir=str(tmp_path)) == "youtube_shorts"
+
+    def test_default_config(self, tmp_path):
+        """Test that a default config catches unknown extractors."""
+        (tmp_path / "default.yaml").write_text("movie:\n  - title: '{title}'\n")
+
+        assert resolve_extractor({"extractor": "generic"}, config_dir=str(tmp_path)) == "default"
+        assert resolve_extractor({}, config_dir=str(tmp_path)) == "default"
+        assert resolve_extractor(extractor="generic", config_dir=str(tmp_path)) == "generic"
+
+
+@pytest.mark.unit
+class TestXmlSerialization:
+    """Test the pretty printing XML serializer."""
+
+    def test_pretty_printed_layout(self):
+        """Test indentation, attributes and empty elements."""
+        top = ET.Element("episodedetails")
+        ET.SubElement(top, "title").text = "Title"
+        ET.SubElement(top, "uniqueid", {"type": "youtube", "default": "true"}).text = "abc"
+        ET.SubElement(ET.SubElement(top, "actor"), "name").text = "Someone"
+        ET.SubElement(top, "plot").text = ""
+
+        assert to_xml(top) == (
+            '<?xml version="1.0" ?>\n'
+            "<episodedetails>\n"
+            "    <title>Title</title>\n"
+            '    <uniqueid type="youtube" default="true">abc</uniqueid>\n'
+            "    <actor>\n"
+            "        <name>Someone</name>\n"
+            "    </actor>\n"
+            "    <plot/>\n"
+            "</episodedetails>\n"
+        )
+
+    def test_escaping(self):
+        """Test escaping of text and attribute values."""
+        top = ET.Element("episodedetails")
+        ET.SubElement(top, "plot", {"x": 'a "b"\n<c>'}).text = 'Tom & "Jerry" <3\r\n'
+
+        assert to_xml(top).splitlines()[2] == (
+            '    <plot x="a &quot;b&quot;&#10;&lt;c&gt;">Tom &amp; "Jerry" &lt;3'
+        )
+
+    @pytest.mark.skipif(sys.version_info < (3, 13), reason="minidom escaping changed in 3.13")
+    def test_matches_minidom(self, sample_youtube_json_data):
+        """Test that output is identical to the previous minidom round trip."""
+        data = dict(sample_youtube_json_data, description='Line 1\r\nLine "2" & <3>\n')
+        nfo = Nfo("youtube", "test.info.json")
+        nfo.generate(data)
+
+        expected = minidom.parseString(ET.tostring(nfo.top, "utf-8")).toprettyxml(indent="    ")
+        assert nfo.get_nfo() == expected
+
+    def test_write_nfo_bytes(self, tmp_path, sample_youtube_json_data):
+        """Test that written files contain the encoded serializer output."""
+        nfo = Nfo("youtube", "test.info.json")
+        nfo.generate(dict(sample_youtube_json_data, title="Tïtle"))
+        nfo_path = tmp_path / "video.nfo"
+
+        nfo.write_nfo(str(nfo_path))
+
+        assert nfo_path.read_bytes() == nfo.get_nfo().replace("\n", os.linesep).encode("utf-8")
+
+
+@pytest.mark.unit
+class TestNfoWriteAvoidance:
+    """Test that unchanged NFOs are not rewritten."""
+
+    def test_identical_file_not_rewritten(self, tmp_path, sample_youtube_json_data):
+        """Test that writing identical content leaves the file untouched."""
+        nfo = Nfo("youtube", "test.info.json")
+        nfo.generate(sample_youtube_json_data)
+        nfo_path = tmp_path / "video.nfo"
+
+        assert nfo.write_nfo(str(nfo_path)) is True
+        os.utime(nfo_path, ns=(0, 0))
+
+        assert nfo.write_nfo(str(nfo_path)) is False
+        assert nfo_path.stat().st_mtime_ns == 0
+
+    def test_changed_file_rewritten(self, tmp_path, sample_youtube_json_data):
+        """Test that files with different content are replaced."""
+        nfo = Nfo("youtube", "test.info.json")
+        nfo.generate(sample_youtube_json_data)
+        nfo_path = tmp_path / "video.nfo"
+        nfo_path.write_text(nfo.get_nfo().replace("Test Video", "Best Video"), encoding="utf-8")
+
+        assert nfo.write_nfo(str(nfo_path)) is True
+        assert "Test Video Title" in nfo_path.read_text(encoding="utf-8")
@@ -0,0 +1,101 @@
+"""Tests for parallel conversion."""
+
+import json
+import os
+
+import pytest
+
+from ytdl_nfo.parallel import FAILED, UNCHANGED, WRITTEN, convert_file, run_parallel
+
+
+@pytest.fixture
+def json_files(tmp_path, sample_youtube_json_data):
+    """Create a directory of .info.json files."""
+    paths = []
+    for i in range(10):
+        json_file = tmp_path / f"video_{i}.info.json"
+        data = dict(sample_youtube_json_data, title=f"Video {i}")
+        json_file.write_text(json.dumps(data), encoding="utf-8")
+        paths.append(str(json_file))
+    return paths
+
+
+@pytest.mark.unit
+class TestConvertFile:
+    """Test single file conversion used by workers."""
+
+    def test_converts_file(self, json_files):
+        """Test that a file is converted and reported as written."""
+        result = convert_file(json_files[0])
+
+        assert result[:4] == (json_files[0], WRITTEN, None, "youtube")
+        assert result.error is None
+
+    def test_unchanged_nfo_reported(self, json_files):
+        """Test that identical NFOs are reported as unchanged."""
+        convert_file(json_files[0])
+
+        assert convert_file(json_files[0])[:4] == (json_files[0], UNCHANGED, None, "youtube")
+
+    def test_failed_conversion_reported(self, tmp_path):
+        """Test that unreadable input is reported as failed."""
+        json_file = tmp_path / "broken.info.json"
+        json_file.write_text("{", encoding="utf-8")
+
+        result = convert_file(str(json_file))
+
+        assert result.status == FAILED
+        assert result.error == "json"
+
+    def test_tracked_conversion_returns_record(self, json_files):
+        """Test that tracked conversions return a manifest record."""
+        result = convert_file(json_files[0], track=True)
+        record = result.record
+
+        assert result.status == WRITTEN
+        assert record.extractor == "youtube"
+        assert record.nfo_path.endswith("video_0.nfo")
+
+    def test_tracked_missing_file_reported(self, json_files, caplog):
+        """Test that a file deleted before a tracked conversion only fails itself."""
+        os.remove(json_files[0])
+
+        result = convert_file(json_files[0], track=True)
+
+        assert result.status == FAILED
+        assert result.error == "read"
+        assert "Failed to read file" in caplog.text
+
+
+@pytest.mark.integration
+class TestRunParallel:
+    """Test conversion across a process pool."""
+
+    def test_ordered_results(self, json_files):
+        """Test that ordered results follow the input order."""
+        results = list(run_parallel(json_files, 2))
+
+        assert [result.path for result in results] == json_files
+        assert all(result.status == WRITTEN for result in results)
+
+    def test_file_deleted_after_scan(self, json_files):
+        """Test that a file deleted between scan and conversion does not stop the run."""
+
+        def scan():
+            yield json_files[0]
+            os.remove(json_files[1])
+            yield from json_files[1:]
+
+        results = list(run_parallel(scan(), 2, track=True))
+
+        assert [result.status for result in results] == [WRITTEN, FAILED] + [WRITTEN] * 8
+        assert results[1].error == "read"
+
+    def test_unordered_results(self, json_files):
+        """Test that unordered mode still converts every file."""
+        results = list(run_parallel(json_files, 2, ordered=False))
+
+        assert sorted(result.path for result in results) == sorted(json_files)
+        for path in json_files:
+            with open(path[:-10] + ".nfo", encoding="utf-8") as f:
+                assert "<title>Video" in f.read()
@@ -0,0 +1,90 @@
+"""Tests for the asynchronous I/O pipeline."""
+
+import json
+import threading
+
+import pytest
+
+from ytdl_nfo import stats
+from ytdl_nfo.manifest import hash_file
+from ytdl_nfo.parallel import FAILED, UNCHANGED, WRITTEN
+from ytdl_nfo.pipeline import run_pipeline
+
+
+@pytest.fixture
+def json_files(tmp_path, sample_youtube_json_data):
+    """Create a few .info.json files."""
+    paths = []
+    for i in range(12):
+        json_file = tmp_path / f"video_{i}.info.json"
+        json_file.write_text(json.dumps(sample_youtube_json_data), encoding="utf-8")
+        paths.append(str(json_file))
+    return paths
+
+
+@pytest.mark.integration
+class TestRunPipeline:
+    """Test converting files through the pipeline."""
+
+    def test_all_files_converted(self, json_files):
+        """Test that every file is converted once, then left unchanged."""
+        results = list(run_pipeline(json_files, io_concurrency=4, queue_size=3))
+
+        assert sorted(result.path for result in results) == sorted(json_files)
+        assert all(result.status == WRITTEN for result in results)
+        for path in json_files:
+            assert "<title>Test Video Title</title>" in open(path[:-10] + ".nfo").read()
+
+        again = list(run_pipeline(json_files, io_concurrency=4))
+        assert all(result.status == UNCHANGED for result in again)
+
+    def test_failed_file(self, tmp_path, json_files):
+        """Test that broken and missing files are reported as failed."""
+        broken = tmp_path / "broken.info.json"
+        broken.write_text("{", encoding="utf-8")
+        missing = str(tmp_path / "missing.info.json")
+
+        results = {r.path: r.status for r in run_pipeline([str(broken), missing] + json_files)}
+
+        assert results[str(broken)] == FAILED
+        assert results[missing] == FAILED
+        assert list(results.values()).count(WRITTEN) == len(json_files)
+
+    def test_records_with_hash(self, json_files):
+        """Test that manifest records carry the hash of the bytes read."""
+        results = list(run_pipeline(json_files[:1], track=True, hash_inputs=True))
+
+        assert results[0].record.input_hash == hash_file(json_files[0])
+        assert results[0].record.nfo_path.endswith("video_0.nfo")
+
+    def test_scan_errors_raised(self, json_files):
+        """Test that an error from the file source reaches the consumer."""
+
+        def file_paths():
+            yield json_files[0]
+            raise RuntimeError("scan failed")
+
+        with pytest.raises(RuntimeError, match="scan failed"):
+            list(run_pipeline(file_paths()))
+
+    def test_early_close(self, json_files):
+        """Test that closing the results stops the pipeline and its threads."""
+        threads = threading.active_count()
+        results = run_pipeline(json_files, io_concurrency=2, queue_size=2)
+
+        next(results)
+        results.close()
+
+        assert threading.active_count() == threads
+
+    def test_stats_collected(self, json_files):
+        """Test that timings from the I/O threads are recorded."""
+        collector = stats.enable()
+        try:
+            list(run_pipeline(json_files, io_concurrency=4))
+        finally:
+            stats.disable()
+
+        assert collector.stages["read"].count == len(json_files)
+        assert collector.stages["write"].count == len(json_files)
+        assert collector.as_dict()["files"] == {WRITTEN: len(json_files)}
@@ -0,0 +1,63 @@
+"""Tests for the yt-dlp post-processor plugin."""
+
+import pytest
+import yt_dlp
+
+from yt_dlp_plugins.postprocessor.ytdl_nfo_pp import NfoPP
+
+
+def load_postprocessor(argument):
+    # Build the post-processor the way yt-dlp does for --use-postprocessor
+    options = yt_dlp.parse_options(["--use-postprocessor", argument]).ydl_opts
+    postprocessors = [pp for pp in options["postprocessors"] if pp["key"] == "Nfo"]
+    ydl = yt_dlp.YoutubeDL({"postprocessors": postprocessors, "quiet": True})
+    # yt-dlp imports plugins under its own module names, so classes are matched by name
+    return ydl, [pp for pp in ydl._pps["after_move"] if type(pp).__name__ == "NfoPP"]
+
+
+@pytest.mark.unit
+class TestNfoPP:
+    """Test writing NFOs from yt-dlp info dicts."""
+
+    def test_writes_nfo_next_to_media(self, tmp_path, sample_youtube_json_data):
+        """Test that the NFO is written beside the downloaded file."""
+        info = dict(sample_youtube_json_data, filepath=str(tmp_path / "Test Video Title.mp4"))
+
+        files, result = NfoPP().run(info)
+
+        assert files == []
+        assert result is info
+        nfo = (tmp_path / "Test Video Title.nfo").read_text(encoding="utf-8")
+        assert "<title>Test Video Title</title>" in nfo
+
+    def test_missing_config_leaves_info_untouched(self, tmp_path):
+        """Test that unknown extractors do not fail the download."""
+        info = {"extractor": "generic", "filepath": str(tmp_path / "video.mp4")}
+
+        assert NfoPP().run(info) == ([], info)
+        assert not (tmp_path / "video.nfo").exists()
+
+    def test_use_postprocessor_arguments(self, tmp_path, sample_youtube_json_data):
+        """Test that --use-postprocessor arguments reach the plugin and its output."""
+        config_dir = tmp_path / "configs"
+        config_dir.mkdir()
+        (config_dir / "custom.yaml").write_text("movie:\n  - title: 'Custom {title}'\n")
+
+        _, pps = load_postprocessor(
+            f"Nfo:when=after_move;config_dir={config_dir};extractor=custom"
+        )
+        info = dict(sample_youtube_json_data, filepath=str(tmp_path / "video.mp4"))
+
+        assert len(pps) == 1
+        assert pps[0].run(info) == ([], info)
+        nfo = (tmp_path / "video.nfo").read_text(encoding="utf-8")
+        assert "<title>Custom Test Video Title</title>" in nfo
+
+    def test_missing_filepath_warns(self):
+        """Test that info dicts without a downloaded file are passed through."""
+        ydl, (pp,) = load_postprocessor("Nfo:when=after_move")
+        warnings = []
+        ydl.report_warning = lambda message, *args, **kwargs: warnings.append(message)
+
+        assert pp.run({"extractor": "youtube"}) == ([], {"extractor": "youtube"})
+        assert warnings == ["No downloaded file to write an NFO for"]
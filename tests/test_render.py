@@ -0,0 +1,97 @@
+"""Tests for the in-memory rendering API."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ytdl_nfo import Ytdl_nfo, render, render_many
+
+
+def traceback_depth(error):
+    depth = 0
+    tb = error.__traceback__
+    while tb is not None:
+        depth += 1
+        tb = tb.tb_next
+    return depth
+
+
+@pytest.mark.unit
+class TestRender:
+    """Test rendering info dicts to NFO bytes."""
+
+    def test_render_returns_bytes(self, sample_youtube_json_data):
+        """Test that an info dict renders to encoded XML."""
+        result = render(sample_youtube_json_data)
+
+        assert isinstance(result, bytes)
+        assert result.startswith(b'<?xml version="1.0" ?>\n<episodedetails>')
+        assert b"<title>Test Video Title</title>" in result
+
+    def test_matches_file_conversion(self, temp_json_file, sample_youtube_json_data):
+        """Test that in-memory and file based output are identical."""
+        ytdl = Ytdl_nfo(str(temp_json_file))
+        ytdl.process()
+
+        assert render(sample_youtube_json_data) == ytdl.get_nfo().encode("utf-8")
+
+    def test_explicit_extractor(self, sample_twitch_json_data):
+        """Test that the extractor can be given explicitly."""
+        result = render(sample_twitch_json_data, "youtube")
+
+        assert b'type="youtube"' in result
+
+    def test_does_not_modify_input(self):
+        """Test that the info dict is left untouched."""
+        info_dict = {"title": "x", "extractor": "youtube", "epoch": 1673827200}
+
+        render(info_dict)
+
+        assert info_dict == {"title": "x", "extractor": "youtube", "epoch": 1673827200}
+
+    @pytest.mark.parametrize(
+        "info_dict",
+        [
+            {"title": "x", "upload_date": "20230115"},
+            {"extractor": "nonexistent_extractor", "upload_date": "20230115"},
+            {"extractor": "youtube"},
+        ],
+    )
+    def test_errors_raise_value_error(self, info_dict):
+        """Test that unrenderable dicts raise ValueError."""
+        with pytest.raises(ValueError):
+            render(info_dict)
+
+    def test_config_error_not_shared(self, tmp_path, sample_youtube_json_data):
+        """Test that every call raises its own exception for a broken config."""
+        (tmp_path / "youtube.yaml").write_text("movie:\n  - title: '{title'\n")
+        errors = []
+        for _ in range(3):
+            with pytest.raises(ValueError) as excinfo:
+                render(sample_youtube_json_data, config_dir=str(tmp_path))
+            errors.append(excinfo.value)
+
+        # A shared exception would keep the frames of every call in its traceback
+        assert len({id(error) for error in errors}) == 3
+        assert len({traceback_depth(error) for error in errors}) == 1
+        assert str(errors[0]) == str(errors[2])
+
+    def test_render_many(self, sample_youtube_json_data):
+        """Test that batches yield bytes, or None for failures."""
+        other = dict(sample_youtube_json_data, title="Other")
+
+        results = list(render_many([sample_youtube_json_data, {"title": "x"}, other]))
+
+        assert b"Test Video Title" in results[0]
+        assert results[1] is None
+        assert b"Other" in results[2]
+
+    def test_thread_safe(self, sample_youtube_json_data):
+        """Test that concurrent renders produce independent results."""
+        info_dicts = [dict(sample_youtube_json_data, title=f"Video {i}") for i in range(50)]
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(render, info_dicts))
+
+        for i, result in enumerate(results):
+            assert f"<title>Video {i}</title>".encode() in result
@@ -0,0 +1,174 @@
+"""Tests for the directory scanner."""
+
+import os
+
+import pytest
+
+from ytdl_nfo.scan import PRUNE, Found, Scanner, Shard, nfo_exists
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("{}", encoding="utf-8")
+    return str(path)
+
+
+def scan_paths(scanner, top):
+    return [found.path for found in scanner.scan(str(top))]
+
+
+@pytest.mark.unit
+class TestScanner:
+    """Test finding JSON files."""
+
+    def test_walk_order(self, tmp_path):
+        """Test that files come before sub directories, like os.walk."""
+        touch(tmp_path / "b" / "video.info.json")
+        touch(tmp_path / "a" / "video.info.json")
+        root_file = touch(tmp_path / "video.info.json")
+
+        paths = scan_paths(Scanner(), tmp_path)
+
+        assert paths[0] == root_file
+        assert sorted(paths[1:]) == sorted(
+            str(tmp_path / name / "video.info.json") for name in ("a", "b")
+        )
+
+    def test_include_exclude(self, tmp_path):
+        """Test the include and exclude patterns and that live chats are skipped."""
+        wanted = touch(tmp_path / "video.info.json")
+        touch(tmp_path / "video.live_chat.json")
+        touch(tmp_path / "video.comments.json")
+        touch(tmp_path / "video.mp4")
+
+        paths = scan_paths(Scanner(exclude=[r"\.comments\."]), tmp_path)
+
+        assert paths == [wanted]
+
+    def test_exclude_inline_flags(self, tmp_path):
+        """Test that each exclude pattern may carry its own global flags."""
+        wanted = touch(tmp_path / "video.info.json")
+        touch(tmp_path / "video.Comments.JSON")
+        touch(tmp_path / "other.info.json")
+
+        scanner = Scanner(r"(?i)\.json$", exclude=[r"(?i)\.comments\.json$", r"^other\."])
+
+        assert scan_paths(scanner, tmp_path) == [wanted]
+
+    def test_prune(self, tmp_path):
+        """Test that pruned directories are not entered."""
+        wanted = touch(tmp_path / "channel" / "video.info.json")
+        touch(tmp_path / "@eaDir" / "video.info.json")
+        touch(tmp_path / ".Trash-1000" / "video.info.json")
+        touch(tmp_path / "channel" / "tmp.part" / "video.info.json")
+
+        paths = scan_paths(Scanner(prune=PRUNE + ("*.part",)), tmp_path)
+
+        assert paths == [wanted]
+
+    def test_symlink_loop(self, tmp_path):
+        """Test that a symlink loop is entered once when following symlinks."""
+        wanted = touch(tmp_path / "channel" / "video.info.json")
+        os.symlink(tmp_path, tmp_path / "channel" / "loop")
+
+        assert scan_paths(Scanner(follow_symlinks=True), tmp_path) == [wanted]
+        assert scan_paths(Scanner(), tmp_path) == [wanted]
+
+    def test_symlinked_files_deduplicated(self, tmp_path):
+        """Test that a file reached through symlinks is found once."""
+        wanted = touch(tmp_path / "video.info.json")
+        (tmp_path / "a").mkdir()
+        os.symlink(wanted, tmp_path / "a" / "link.info.json")
+        os.symlink(tmp_path / "a", tmp_path / "b")
+
+        assert scan_paths(Scanner(follow_symlinks=True), tmp_path) == [wanted]
+
+    def test_hard_links_kept(self, tmp_path):
+        """Test that hard links in separate directories are each found."""
+        first = touch(tmp_path / "a" / "video.info.json")
+        (tmp_path / "b").mkdir()
+        os.link(first, tmp_path / "b" / "video.info.json")
+
+        assert len(scan_paths(Scanner(), tmp_path)) == 2
+
+    def test_unreadable_directory(self, tmp_path, caplog):
+        """Test that a missing directory is reported and skipped."""
+        assert scan_paths(Scanner(), tmp_path / "missing") == []
+        assert "Failed to read directory" in caplog.text
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Create channel directories of videos, and a few files at the top."""
+    for channel in range(8):
+        for video in range(5):
+            touch(tmp_path / f"channel{channel}" / f"season1/video{video}.info.json")
+    for video in range(3):
+        touch(tmp_path / f"video{video}.info.json")
+    touch(tmp_path / "channel0" / "video0.comments.json")
+    return tmp_path
+
+
+@pytest.mark.unit
+class TestShard:
+    """Test splitting the scan between independent runs."""
+
+    @pytest.mark.parametrize("by", ["path", "directory"])
+    def test_partition(self, tree, by):
+        """Test that shards cover every file exactly once."""
+        everything = scan_paths(Scanner(), tree)
+
+        shards = [scan_paths(Scanner(shard=Shard(i, 3, by)), tree) for i in range(3)]
+
+        assert sorted(path for paths in shards for path in paths) == sorted(everything)
+        assert all(paths for paths in shards)
+
+    def test_directories_kept_together(self, tree):
+        """Test that sharding by directory keeps each top level directory in one shard."""
+        shards = [scan_paths(Scanner(shard=Shard(i, 3, "directory")), tree) for i in range(3)]
+
+        for channel in range(8):
+            prefix = str(tree / f"channel{channel}") + os.sep
+            assert sum(any(p.startswith(prefix) for p in paths) for paths in shards) == 1
+
+    def test_stable_assignment(self):
+        """Test that assignments only depend on the relative path."""
+        # Runs on other machines or versions must keep agreeing on these
+        scanner = Scanner(shard=Shard(6, 7, "path"))
+        assert scanner.in_shard("channel/video.info.json")
+        assert not scanner.in_shard("channel/other.info.json")
+
+        scanner = Scanner(shard=Shard(0, 7, "directory"))
+        assert scanner.in_shard("channel/video.info.json")
+        assert scanner.in_shard("channel/other.info.json")
+
+    def test_composes_with_filters(self, tree):
+        """Test that include and exclude patterns apply within each shard."""
+        scanner = Scanner(exclude=[r"^video1\."], shard=Shard(0, 2, "path"))
+        everything = set(scan_paths(Scanner(exclude=[r"^video1\."]), tree))
+
+        paths = scan_paths(scanner, tree)
+        other = scan_paths(Scanner(exclude=[r"^video1\."], shard=Shard(1, 2, "path")), tree)
+
+        assert set(paths) | set(other) == everything
+        assert not any(os.path.basename(path).startswith("video1.") for path in paths)
+
+
+@pytest.mark.unit
+class TestNfoExists:
+    """Test looking up existing NFOs from the directory listing."""
+
+    def test_from_listing(self, tmp_path):
+        """Test that NFOs next to the JSON file are resolved from the listing."""
+        found = Found(str(tmp_path / "video.info.json"), frozenset(["video.nfo"]))
+
+        assert nfo_exists(str(tmp_path / "video.nfo"), found)
+        assert not nfo_exists(str(tmp_path / "other.nfo"), found)
+
+    def test_other_directory(self, tmp_path):
+        """Test that NFOs in another directory fall back to a stat."""
+        nfo_file = tmp_path / "sub" / "video.nfo"
+        touch(nfo_file)
+        found = Found(str(tmp_path / "video.json"), frozenset())
+
+        assert nfo_exists(str(nfo_file), found)
@@ -0,0 +1,85 @@
+"""Tests guarding command line startup time."""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time of the ytdl_nfo package, in microseconds. It is
+# about 50ms on a laptop, the budget leaves room for slow CI machines.
+IMPORT_BUDGET_US = 150_000
+
+# Modules only specific options need, none of them may be imported up front
+DEFERRED = [
+    "asyncio",
+    "cProfile",
+    "ctypes",
+    "importlib.resources",
+    "multiprocessing",
+    "sqlite3",
+    "xml.dom",
+    "yaml",
+]
+
+
+def imported_modules(code):
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys, json; print(json.dumps(sorted(sys.modules)))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+def import_time_us():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import ytdl_nfo"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines read "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.rsplit("|", 2)
+        if name.strip() == "ytdl_nfo":
+            return int(cumulative)
+    raise AssertionError("ytdl_nfo missing from -X importtime output")
+
+
+@pytest.mark.integration
+class TestStartup:
+    """Test that startup only imports what a run needs."""
+
+    def test_import_deferred(self):
+        """Test that importing the package leaves optional modules unloaded."""
+        modules = imported_modules("import ytdl_nfo")
+
+        assert modules.isdisjoint(DEFERRED)
+
+    def test_single_file_deferred(self, temp_json_file):
+        """Test that converting one file with cached configs skips optional modules."""
+        command = [sys.executable, "-m", "ytdl_nfo", str(temp_json_file)]
+        subprocess.run(command, capture_output=True, check=True)
+        code = f"import sys, ytdl_nfo\nsys.argv = {command[2:] + ['-w']!r}\nytdl_nfo.main()"
+
+        modules = imported_modules(code)
+
+        assert temp_json_file.with_name("test_video.nfo").exists()
+        assert modules.isdisjoint(DEFERRED)
+
+    def test_rendering_api(self):
+        """Test that the rendering API is still reachable from the package."""
+        import ytdl_nfo
+
+        assert callable(ytdl_nfo.render)
+        assert callable(ytdl_nfo.render_many)
+        assert ytdl_nfo.nfo.render is ytdl_nfo.render
+
+    def test_import_time_budget(self):
+        """Test that importing the package stays within its time budget."""
+        # Best of a few runs to ride out noisy neighbours
+        best = min(import_time_us() for _ in range(3))
+
+        assert best < IMPORT_BUDGET_US, f"import ytdl_nfo took {best}us"
@@ -0,0 +1,148 @@
+"""Tests for run statistics."""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from ytdl_nfo import stats
+from ytdl_nfo.parallel import FAILED, WRITTEN, convert_file, run_parallel
+
+
+@pytest.fixture
+def collector():
+    """Enable statistics for the duration of a test."""
+    yield stats.enable(top_n=2)
+    stats.disable()
+
+
+def write_videos(tmp_path, sample_youtube_json_data, count):
+    paths = []
+    for i in range(count):
+        json_file = tmp_path / f"video_{i}.info.json"
+        json_file.write_text(json.dumps(sample_youtube_json_data), encoding="utf-8")
+        paths.append(str(json_file))
+    return paths
+
+
+@pytest.mark.unit
+class TestHistogram:
+    """Test the bucketed timing histogram."""
+
+    def test_percentiles(self):
+        """Test that percentiles report the bucket bound, capped at the maximum."""
+        histogram = stats._Histogram()
+        for seconds in [0.001] * 90 + [0.5] * 10:
+            histogram.observe(seconds)
+
+        summary = histogram.summary()
+
+        assert summary["count"] == 100
+        assert summary["p50"] == pytest.approx(0.001)
+        assert summary["p99"] == pytest.approx(0.5)
+        assert summary["max"] == 0.5
+
+    def test_merge(self):
+        """Test that merged histograms add up."""
+        left, right = stats._Histogram(), stats._Histogram()
+        left.observe(0.01)
+        right.observe(2.0)
+
+        left.merge(right)
+
+        assert left.count == 2
+        assert left.total == pytest.approx(2.01)
+        assert left.max == 2.0
+
+
+@pytest.mark.unit
+class TestStats:
+    """Test collecting and reporting statistics."""
+
+    def test_disabled_by_default(self):
+        """Test that helpers are no-ops without a collector."""
+        assert stats.current is None
+        with stats.timer("read"):
+            pass
+        stats.add_bytes("read", 10)
+        stats.file_done("x.info.json", "youtube", WRITTEN, 1.0)
+
+        assert stats.current is None
+
+    def test_slowest_files_kept(self, collector):
+        """Test that only the slowest files are kept."""
+        for seconds in (0.1, 0.3, 0.2):
+            stats.file_done(f"{seconds}.info.json", "youtube", WRITTEN, seconds)
+
+        slowest = collector.as_dict()["slowest"]
+
+        assert [item["path"] for item in slowest] == ["0.3.info.json", "0.2.info.json"]
+
+    def test_merge(self):
+        """Test that worker statistics merge into the parent."""
+        parent, worker = stats.Stats(), stats.Stats()
+        worker.file_done("a.info.json", "youtube", WRITTEN, 0.1)
+        worker.bytes["read"] += 100
+        parent.file_done("b.info.json", "youtube", FAILED, 0.2)
+
+        parent.merge(worker)
+        report = parent.as_dict()
+
+        assert report["files"] == {WRITTEN: 1, FAILED: 1}
+        assert report["bytes"] == {"read": 100}
+        assert report["stages"]["file"]["count"] == 2
+
+    def test_reports(self, collector):
+        """Test the text, JSON and Prometheus reports."""
+        collector.file_done("a.info.json", 'odd"name', WRITTEN, 0.1)
+        collector.observe("read", 0.001)
+        collector.finish(json_backend="orjson")
+
+        assert "Slowest files:" in collector.to_text()
+        assert "JSON backend: orjson" in collector.to_text()
+        assert json.loads(collector.to_json())["files"] == {WRITTEN: 1}
+        prometheus = collector.to_prometheus()
+        assert 'ytdl_nfo_files{extractor="odd\\"name",status="written"} 1' in prometheus
+        assert 'ytdl_nfo_stage_seconds_count{stage="read"} 1' in prometheus
+
+
+@pytest.mark.integration
+class TestCollection:
+    """Test statistics gathered while converting."""
+
+    def test_convert_file(self, collector, temp_json_file):
+        """Test that converting a file records its stages."""
+        convert_file(str(temp_json_file))
+
+        report = collector.as_dict()
+
+        assert report["extractors"] == {"youtube": {WRITTEN: 1}}
+        assert {"read", "decode", "config", "render", "write", "file"} <= set(report["stages"])
+        assert report["bytes"]["read"] == temp_json_file.stat().st_size
+
+    def test_workers_merged(self, collector, tmp_path, sample_youtube_json_data):
+        """Test that statistics from worker processes reach the parent."""
+        paths = write_videos(tmp_path, sample_youtube_json_data, 4)
+
+        list(run_parallel(paths, 2))
+
+        assert collector.as_dict()["files"] == {WRITTEN: 4}
+        assert collector.stages["render"].count == 4
+
+    def test_cli_report(self, tmp_path, sample_youtube_json_data):
+        """Test the JSON report and Prometheus file written by the CLI."""
+        write_videos(tmp_path, sample_youtube_json_data, 2)
+        prom_file = tmp_path / "ytdl_nfo.prom"
+
+        result = subprocess.run(
+            [sys.executable, "-m", "ytdl_nfo", "--stats", "json"]
+            + ["--stats-prometheus", str(prom_file), str(tmp_path)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        report = json.loads(result.stdout[result.stdout.index("{") :])
+        assert report["files"] == {WRITTEN: 2}
+        assert "ytdl_nfo_files" in prom_file.read_text()
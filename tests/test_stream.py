@@ -0,0 +1,224 @@
+"""Tests for streaming playlist info.json files."""
+
+import json
+import logging
+import sys
+
+import pytest
+
+from ytdl_nfo import stream
+from ytdl_nfo.stream import Playlist, decode_spans, read_members
+from ytdl_nfo.Ytdl_nfo import Ytdl_nfo
+
+
+@pytest.fixture
+def playlist_data():
+    """Return a channel info.json with entries before and after other fields."""
+    return {
+        "_type": "playlist",
+        "id": "UC123",
+        "entries": [
+            {
+                "id": "a1",
+                "title": 'Brackets ] } [ { and "quotes" \\',
+                "extractor": "youtube",
+                "upload_date": "20230115",
+                "formats": [{"url": "https://example.com/a", "tbr": 1.5}],
+            },
+            {
+                "id": "b/2",
+                "title": "Flat entry",
+                "ie_key": "Youtube",
+                "upload_date": "20230116",
+            },
+        ],
+        "title": "Channel",
+        "uploader": "Uploader",
+        "extractor": "youtube:tab",
+        "modified_date": "20240101",
+        "upload_date": "20240101",
+        "view_count": None,
+        "tags": ["a", "b"],
+    }
+
+
+def open_playlist(tmp_path, raw):
+    json_file = tmp_path / "channel.info.json"
+    json_file.write_bytes(raw)
+    with open(json_file, "rb") as f:
+        return Playlist(f)
+
+
+@pytest.mark.unit
+class TestPlaylist:
+    """Test reading fields and entries from a mapped file."""
+
+    @pytest.mark.parametrize("indent", [None, 2])
+    def test_fields_and_entries(self, tmp_path, playlist_data, indent):
+        """Test that fields and entries match a full decode."""
+        playlist = open_playlist(tmp_path, json.dumps(playlist_data, indent=indent).encode())
+
+        data = playlist.read_fields()
+
+        expected = dict(playlist_data)
+        entries = expected.pop("entries")
+        assert data == expected
+        assert list(playlist.entries()) == entries
+        playlist.close()
+
+    def test_no_entries(self, tmp_path):
+        """Test that documents without entries yield none."""
+        playlist = open_playlist(tmp_path, b'{"id": "x", "entries": null}')
+
+        assert playlist.read_fields() == {"id": "x", "entries": None}
+        assert list(playlist.entries()) == []
+
+    def test_empty_entries(self, tmp_path):
+        """Test that an empty entries array yields none."""
+        playlist = open_playlist(tmp_path, b'{"entries": [ ], "id": "x"}')
+
+        assert playlist.read_fields() == {"id": "x"}
+        assert list(playlist.entries()) == []
+
+    def test_pages_released(self, tmp_path, playlist_data, monkeypatch):
+        """Test that parsing still works when pages are dropped as it goes."""
+        monkeypatch.setattr(stream, "_RELEASE_SIZE", 1)
+        playlist_data["entries"] *= 5000
+        playlist = open_playlist(tmp_path, json.dumps(playlist_data).encode())
+
+        assert playlist.read_fields()["title"] == "Channel"
+        assert sum(1 for _ in playlist.entries()) == 10000
+
+    @pytest.mark.parametrize(
+        "raw",
+        [
+            b"",
+            b"[]",
+            b'{"a": 1',
+            b'{"a" 1}',
+            b'{"a": 1,}',
+            b'{"a": [1, 2}',
+            b'{"a": "x}',
+            b'{"a": 1} x',
+            b"{a: 1}",
+        ],
+    )
+    def test_malformed_documents(self, tmp_path, raw):
+        """Test that malformed documents raise JSONDecodeError."""
+        playlist = open_playlist(tmp_path, raw)
+
+        with pytest.raises(json.JSONDecodeError):
+            playlist.read_fields()
+
+    def test_malformed_entry(self, tmp_path):
+        """Test that a broken entry raises once it is reached."""
+        playlist = open_playlist(tmp_path, b'{"entries": [{"id": 1}, {"id": }]}')
+        playlist.read_fields()
+        entries = playlist.entries()
+
+        assert next(entries) == {"id": 1}
+        with pytest.raises(json.JSONDecodeError):
+            next(entries)
+
+
+@pytest.mark.unit
+class TestReadMembers:
+    """Test projecting top level members without decoding containers."""
+
+    def test_containers_delimited(self):
+        """Test that scalars are decoded and containers only delimited."""
+        data = {
+            "id": "abc",
+            "title": 'Brackets ] } and "quotes" \\',
+            "view_count": 10,
+            "is_live": False,
+            "release_date": None,
+            "formats": [{"url": "https://example.com/{x}", "headers": {"a": ["]"]}}],
+            "tags": [],
+        }
+        raw = json.dumps(data, indent=2).encode("utf-8")
+
+        scalars, spans = read_members(raw)
+
+        assert scalars == {key: data[key] for key in ("id", "title", "view_count", "is_live")} | {
+            "release_date": None
+        }
+        assert decode_spans(raw, spans, {"formats", "tags", "missing"}) == {
+            "formats": data["formats"],
+            "tags": [],
+        }
+
+    def test_deep_nesting(self):
+        """Test that containers nested deeper than one regex match are still delimited."""
+        deep = {"a": [[[[[[[[[[{"b": "]"}]]]]]]]]]], "c": 1}
+        raw = json.dumps(deep).encode("utf-8")
+
+        scalars, spans = read_members(raw)
+
+        assert scalars == {"c": 1}
+        assert decode_spans(raw, spans, {"a"}) == {"a": deep["a"]}
+
+    def test_duplicate_keys(self):
+        """Test that the last of duplicate keys wins, like json.loads."""
+        scalars, spans = read_members(b'{"a": [1], "b": 2, "a": 3, "b": {"c": 4}}')
+
+        assert scalars == {"a": 3}
+        assert set(spans) == {"b"}
+
+    @pytest.mark.parametrize(
+        "raw",
+        [b"", b"[1, 2]", b'{"a": 1', b'{"a" 1}', b'{"a": 1,}', b'{"a": [1}', b'{"a": 1} x'],
+    )
+    def test_malformed_documents(self, raw):
+        """Test that malformed documents raise JSONDecodeError."""
+        with pytest.raises(json.JSONDecodeError):
+            read_members(raw)
+
+
+@pytest.mark.integration
+class TestStreamedConversion:
+    """Test converting streamed files."""
+
+    def test_large_file_streamed(self, tmp_path, playlist_data, monkeypatch):
+        """Test that files over the size threshold convert like small files."""
+        json_file = tmp_path / "channel.info.json"
+        json_file.write_text(json.dumps(playlist_data), encoding="utf-8")
+        Ytdl_nfo(str(json_file)).process()
+        expected = (tmp_path / "channel.nfo").read_text()
+        # The module shares its name with the class the package exports
+        monkeypatch.setattr(sys.modules["ytdl_nfo.Ytdl_nfo"], "STREAM_SIZE", 0)
+
+        ytdl = Ytdl_nfo(str(json_file))
+
+        assert ytdl.playlist is not None
+        assert "entries" not in ytdl.data
+        assert ytdl.process() is True
+        assert ytdl.written is False
+        assert (tmp_path / "channel.nfo").read_text() == expected
+
+    def test_entry_nfos(self, tmp_path, playlist_data, caplog):
+        """Test that an NFO is written for every entry."""
+        playlist_data["entries"].append({"id": "c3", "title": "No date", "extractor": "youtube"})
+        json_file = tmp_path / "channel.info.json"
+        json_file.write_text(json.dumps(playlist_data), encoding="utf-8")
+
+        caplog.set_level(logging.INFO, logger="ytdl_nfo")
+        ytdl = Ytdl_nfo(str(json_file), entries=True)
+
+        assert ytdl.process() is True
+        assert ytdl.entry_counts == {"written": 2, "failed": 1}
+        assert "<title>Flat entry</title>" in (tmp_path / "channel.b_2.nfo").read_text()
+        assert (tmp_path / "channel.a1.nfo").exists()
+        assert "Entries in" in caplog.text
+
+    def test_config_using_entries(self, tmp_path):
+        """Test that entries are loaded when a config references them."""
+        (tmp_path / "custom.yaml").write_text("movie:\n  - tag>name!: '{entries}'\n")
+        data = {"entries": ["x", "y"], "upload_date": "20230115"}
+        json_file = tmp_path / "channel.info.json"
+        json_file.write_text(json.dumps(data), encoding="utf-8")
+
+        ytdl = Ytdl_nfo(str(json_file), "custom", str(tmp_path), entries=True)
+
+        assert ytdl.data["entries"] == ["x", "y"]
+        assert ytdl.process() is True
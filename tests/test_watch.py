@@ -0,0 +1,141 @@
+"""Tests for watch mode."""
+
+import json
+import os
+import time
+
+import pytest
+
+from ytdl_nfo.scan import Scanner
+from ytdl_nfo.watch import Watcher
+
+
+def accept(file_name):
+    return file_name.endswith(".json") and not file_name.endswith(".live_chat.json")
+
+
+def run_until(watcher, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        watcher.step(timeout=0.05)
+
+
+@pytest.fixture(params=["inotify", "poll"])
+def watcher(request, tmp_path):
+    """Watch a temporary directory with inotify or polling."""
+    converted = []
+    poll_interval = 0.05 if request.param == "poll" else None
+    watcher = Watcher(str(tmp_path), accept, converted.append, 0.1, poll_interval)
+    watcher.converted = converted
+    yield watcher
+    watcher.close()
+
+
+@pytest.mark.integration
+class TestWatcher:
+    """Test picking up written files."""
+
+    def test_new_file_converted(self, watcher, tmp_path):
+        """Test that a new JSON file is converted once it settles."""
+        json_file = tmp_path / "video.info.json"
+        json_file.write_text(json.dumps({"title": "x"}), encoding="utf-8")
+
+        run_until(watcher, lambda: watcher.converted)
+
+        assert watcher.converted == [str(json_file)]
+
+    def test_new_directory_watched(self, watcher, tmp_path):
+        """Test that files in directories created later are picked up."""
+        sub_dir = tmp_path / "channel" / "season"
+        sub_dir.mkdir(parents=True)
+        json_file = sub_dir / "video.info.json"
+        json_file.write_text("{}", encoding="utf-8")
+
+        run_until(watcher, lambda: watcher.converted)
+
+        assert watcher.converted == [str(json_file)]
+
+    def test_ignored_files(self, watcher, tmp_path):
+        """Test that live chat and non JSON files are ignored."""
+        (tmp_path / "video.live_chat.json").write_text("{}", encoding="utf-8")
+        (tmp_path / "video.mp4").write_bytes(b"")
+
+        run_until(watcher, lambda: watcher.converted, timeout=0.5)
+
+        assert watcher.converted == []
+
+    def test_existing_files_not_converted(self, tmp_path):
+        """Test that files present before watching started are left alone."""
+        (tmp_path / "video.info.json").write_text("{}", encoding="utf-8")
+        converted = []
+        watcher = Watcher(str(tmp_path), accept, converted.append, 0.05)
+
+        run_until(watcher, lambda: converted, timeout=0.3)
+        watcher.close()
+
+        assert converted == []
+
+    def test_debounces_repeated_writes(self, watcher, tmp_path):
+        """Test that a file written in several steps is converted once."""
+        json_file = tmp_path / "video.info.json"
+        with open(json_file, "w", encoding="utf-8") as f:
+            f.write('{"title":')
+            f.flush()
+            watcher.step(timeout=0.06)
+            f.write(' "x"}')
+
+        run_until(watcher, lambda: watcher.converted)
+        watcher.step(timeout=0.2)
+
+        assert watcher.converted == [str(json_file)]
+
+
+@pytest.mark.integration
+class TestWatcherPrune:
+    """Test that watch mode honours the scanner's pruning."""
+
+    @pytest.mark.parametrize("poll_interval", [None, 0.05])
+    def test_pruned_directories_ignored(self, tmp_path, poll_interval):
+        """Test that files in pruned directories, old or new, are not converted."""
+        (tmp_path / "@eaDir").mkdir()
+        converted = []
+        watcher = Watcher(
+            str(tmp_path), accept, converted.append, 0.05, poll_interval, Scanner().pruned
+        )
+        try:
+            (tmp_path / "@eaDir" / "video.info.json").write_text("{}", encoding="utf-8")
+            (tmp_path / "channel" / "@eaDir").mkdir(parents=True)
+            (tmp_path / "channel" / "@eaDir" / "video.info.json").write_text("{}", encoding="utf-8")
+            wanted = tmp_path / "channel" / "video.info.json"
+            wanted.write_text("{}", encoding="utf-8")
+
+            run_until(watcher, lambda: converted)
+            watcher.step(timeout=0.2)
+        finally:
+            watcher.close()
+
+        assert converted == [str(wanted)]
+        if poll_interval is None:
+            assert not any("@eaDir" in path for path in watcher.source.dirs.values())
+
+    @pytest.mark.parametrize("poll_interval", [None, 0.05])
+    def test_symlinks_followed_when_asked(self, tmp_path, poll_interval):
+        """Test that symlinked directories are only watched when following symlinks."""
+        target = tmp_path / "target"
+        target.mkdir()
+        top = tmp_path / "top"
+        top.mkdir()
+        os.symlink(target, top / "link")
+        os.symlink(top, target / "loop")
+
+        for follow, expected in ((False, []), (True, [str(top / "link" / "video.info.json")])):
+            converted = []
+            watcher = Watcher(str(top), accept, converted.append, 0.05, poll_interval, None, follow)
+            try:
+                (target / "video.info.json").write_text("{}", encoding="utf-8")
+                run_until(watcher, lambda: converted, timeout=0.5 if not follow else 5.0)
+            finally:
+                watcher.close()
+                (target / "video.info.json").unlink()
+
+            assert converted == expected
@@ -1,10 +1,12 @@
 """Tests for Ytdl_nfo class."""
 
 import json
+import subprocess
+import sys
 
 import pytest
 
-from ytdl_nfo import Ytdl_nfo
+from ytdl_nfo import Target, Ytdl_nfo
 
 
 @pytest.mark.unit
@@ -52,6 +54,17 @@ class TestYtdlNfoExtractorDetection:
         # "twitch:vod" should become "twitch_vod"
         assert ytdl.extractor == "twitch_vod"
 
+    def test_extractor_prefix_fallback(self, tmp_path, sample_youtube_json_data):
+        """Test that extractor variants without a config use their base config."""
+        json_file = tmp_path / "test.info.json"
+        data = dict(sample_youtube_json_data, extractor="youtube:shorts")
+        json_file.write_text(json.dumps(data), encoding="utf-8")
+
+        ytdl = Ytdl_nfo(str(json_file))
+
+        assert ytdl.extractor == "youtube"
+        assert ytdl.process() is True
+
     def test_explicit_extractor_override(self, temp_json_file):
         """Test that explicit extractor parameter overrides auto-detection."""
         ytdl = Ytdl_nfo(str(temp_json_file), extractor="custom_extractor")
@@ -103,3 +116,166 @@ class TestYtdlNfoFilenameDerivarion:
 
         assert nfo_path.endswith(".nfo")
         assert "test_video.nfo" in nfo_path
+
+
+@pytest.mark.unit
+class TestYtdlNfoLazyLoading:
+    """Test deferred loading of JSON and config data."""
+
+    def test_lazy_defers_reading(self, temp_json_file):
+        """Test that lazy instances do not read the file on construction."""
+        ytdl = Ytdl_nfo(str(temp_json_file), lazy=True)
+
+        assert ytdl.loaded is False
+        assert ytdl.data is None
+        assert ytdl.nfo is None
+
+    def test_lazy_nfo_path_without_reading(self, tmp_path):
+        """Test that .info.json NFO paths are derived from the file name alone."""
+        ytdl = Ytdl_nfo(str(tmp_path / "missing.info.json"), lazy=True)
+
+        assert ytdl.get_nfo_path() == str(tmp_path / "missing.nfo")
+        assert ytdl.loaded is False
+
+    def test_lazy_nfo_path_loads_when_needed(self, tmp_path):
+        """Test that other JSON files are read to find the NFO path."""
+        json_file = tmp_path / "metadata.json"
+        json_file.write_text(json.dumps({"_filename": "Custom.mp4"}), encoding="utf-8")
+
+        ytdl = Ytdl_nfo(str(json_file), lazy=True)
+
+        assert ytdl.get_nfo_path() == "Custom.nfo"
+        assert ytdl.loaded is True
+
+    def test_lazy_process(self, temp_json_file):
+        """Test that process() loads lazy instances before generating."""
+        ytdl = Ytdl_nfo(str(temp_json_file), lazy=True)
+
+        assert ytdl.process() is True
+        assert ytdl.extractor == "youtube"
+
+
+@pytest.mark.unit
+class TestYtdlNfoProjectedLoading:
+    """Test loading only the fields a config references."""
+
+    def test_unused_containers_dropped(self, tmp_path, sample_youtube_json_data, json_backend):
+        """Test that containers the config does not use are not kept."""
+        json_backend("json")
+        data = dict(sample_youtube_json_data, formats=[{"url": "x"}], tags=["a"])
+        json_file = tmp_path / "video.info.json"
+        json_file.write_text(json.dumps(data), encoding="utf-8")
+
+        ytdl = Ytdl_nfo(str(json_file), projected=True)
+
+        assert ytdl.data == sample_youtube_json_data
+        assert ytdl.process() is True
+
+    def test_referenced_containers_decoded(self, tmp_path, json_backend):
+        """Test that containers referenced by the config are decoded."""
+        json_backend("json")
+        (tmp_path / "custom.yaml").write_text("movie:\n  - genre!: '{categories}'\n")
+        json_file = tmp_path / "video.info.json"
+        json_file.write_text(
+            json.dumps({"categories": ["Music"], "upload_date": "20230115"}), encoding="utf-8"
+        )
+
+        ytdl = Ytdl_nfo(str(json_file), "custom", str(tmp_path), projected=True)
+
+        assert ytdl.data["categories"] == ["Music"]
+        assert ytdl.process() is True
+
+    def test_invalid_json(self, tmp_path, json_backend):
+        """Test that malformed files are reported like full loads."""
+        json_backend("json")
+        json_file = tmp_path / "invalid.info.json"
+        json_file.write_text('{"title": "x",}', encoding="utf-8")
+
+        ytdl = Ytdl_nfo(str(json_file), projected=True)
+
+        assert ytdl.input_ok is False
+        assert ytdl.data is None
+
+
+@pytest.fixture
+def jellyfin_dir(tmp_path):
+    """Create a config directory for a jellyfin target."""
+    config_dir = tmp_path / "jellyfin"
+    config_dir.mkdir()
+    (config_dir / "youtube.yaml").write_text(
+        "movie:\n  - title: '{title}'\n  - tag!: '{tags}'\n"
+    )
+    return config_dir
+
+
+@pytest.mark.unit
+class TestYtdlNfoTargets:
+    """Test rendering extra NFO flavors from one parse."""
+
+    def test_targets_written(self, tmp_path, sample_youtube_json_data, jellyfin_dir, json_backend):
+        """Test that each target is written with its own config and fields."""
+        json_backend("json")
+        data = dict(sample_youtube_json_data, tags=["a", "b"])
+        json_file = tmp_path / "video.info.json"
+        json_file.write_text(json.dumps(data), encoding="utf-8")
+
+        targets = [Target("jellyfin", str(jellyfin_dir))]
+
+        ytdl = Ytdl_nfo(str(json_file), projected=True, targets=targets)
+
+        assert ytdl.process() is True
+        assert ytdl.get_nfo_paths() == [
+            str(tmp_path / "video.nfo"),
+            str(tmp_path / "video.jellyfin.nfo"),
+        ]
+        main = (tmp_path / "video.nfo").read_text(encoding="utf-8")
+        assert "<episodedetails>" in main
+        assert "<tag>" not in main
+        jellyfin = (tmp_path / "video.jellyfin.nfo").read_text(encoding="utf-8")
+        assert "<movie>" in jellyfin
+        # The main config does not use tags, the target's projection decodes them
+        assert "<tag>a</tag>" in jellyfin
+
+    def test_target_failure_fails_file(self, tmp_path, temp_json_file, jellyfin_dir):
+        """Test that nothing is written when a target cannot be rendered."""
+        (jellyfin_dir / "youtube.yaml").write_text("movie:\n  - title: '{title!z}'\n")
+
+        ytdl = Ytdl_nfo(str(temp_json_file), targets=[Target("jellyfin", str(jellyfin_dir))])
+
+        assert ytdl.process() is False
+        assert ytdl.failure == "render"
+        assert list(tmp_path.glob("*.nfo")) == []
+
+
+@pytest.mark.integration
+class TestTargetsCli:
+    """Test the --target option of the command line."""
+
+    @pytest.mark.parametrize("mode", [[], ["-j", "2"], ["--io-concurrency", "4"]])
+    def test_directory(self, tmp_path, sample_youtube_json_data, jellyfin_dir, mode):
+        """Test that every mode writes the targets and skips them once written."""
+        videos = tmp_path / "videos"
+        videos.mkdir()
+        for i in range(3):
+            data = dict(sample_youtube_json_data, id=f"video{i}")
+            (videos / f"video{i}.info.json").write_text(json.dumps(data), encoding="utf-8")
+        command = [sys.executable, "-m", "ytdl_nfo", "-t", f"jellyfin={jellyfin_dir}", *mode]
+
+        subprocess.run(command + [str(videos)], capture_output=True, check=True)
+        assert len(list(videos.glob("*.jellyfin.nfo"))) == 3
+        assert len(list(videos.glob("*.nfo"))) == 6
+
+        (videos / "video0.jellyfin.nfo").unlink()
+        result = subprocess.run(command + [str(videos)], capture_output=True, text=True, check=True)
+        assert "1 written, 0 unchanged, 0 failed" in result.stderr
+
+    def test_duplicate_names(self, tmp_path):
+        """Test that target names must be unique."""
+        result = subprocess.run(
+            [sys.executable, "-m", "ytdl_nfo", "-t", "a=x", "-t", "a=y", str(tmp_path)],
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 2
+        assert "--target names must be unique" in result.stderr
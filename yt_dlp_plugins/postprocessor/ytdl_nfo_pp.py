@@ -0,0 +1,41 @@
+import os
+
+from yt_dlp.postprocessor.common import PostProcessor
+
+from ytdl_nfo.nfo import get_config, resolve_extractor
+
+
+class NfoPP(PostProcessor):
+    """Write an NFO next to each download from yt-dlp's in-memory info dict.
+
+    Enable with ``--use-postprocessor Nfo:when=after_move``. The optional
+    ``extractor`` and ``config_dir`` arguments match the ytdl-nfo CLI options.
+    """
+
+    def __init__(self, downloader=None, extractor=None, config_dir=None):
+        super().__init__(downloader)
+        self.extractor = extractor
+        self.config_dir = config_dir
+
+    def run(self, info):
+        filepath = info.get("filepath")
+        if not filepath:
+            self.report_warning("No downloaded file to write an NFO for")
+            return [], info
+
+        extractor = resolve_extractor(info, self.extractor, self.config_dir)
+        if extractor is None:
+            self.report_warning("No extractor available to write an NFO")
+            return [], info
+
+        nfo = get_config(extractor, filepath, self.config_dir)
+        if not nfo.config_ok() or not nfo.generate(info):
+            self.report_warning(f"Failed to generate an NFO with the {extractor} config")
+            return [], info
+
+        nfo_path = f"{os.path.splitext(filepath)[0]}.nfo"
+        if nfo.write_nfo(nfo_path):
+            self.to_screen(f"Writing NFO to: {nfo_path}")
+        else:
+            self.to_screen(f"NFO is already up to date: {nfo_path}")
+        return [], info
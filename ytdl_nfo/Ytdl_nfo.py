@@ -1,39 +1,104 @@
 import json
+import logging
 import os
 import re
+from collections import Counter, namedtuple
 
-from .nfo import get_config
+from . import stats
+from .jsonload import backend, loads
+from .nfo import get_config, resolve_extractor
+from .stream import STREAM_SIZE, Playlist, decode_spans, read_members
+
+logger = logging.getLogger(__name__)
+
+# An extra NFO flavor, written to <name>.<target name>.nfo with the configs
+# of its own config directory
+Target = namedtuple("Target", ["name", "config_dir"])
 
 
 class Ytdl_nfo:
-    def __init__(self, file_path, extractor=None):
+    def __init__(
+        self,
+        file_path,
+        extractor=None,
+        config_dir=None,
+        lazy=False,
+        projected=False,
+        entries=False,
+        targets=(),
+    ):
         self.path = file_path
         self.dir = os.path.dirname(file_path)
         self.data = None
         self.filename = None
         self.input_ok = True
         self.extractor = extractor
+        self.config_dir = config_dir
+        self.nfo = None
+        self.loaded = False
+        # Kind of error that stopped the conversion, e.g. "json" or "render"
+        self.failure = None
+        # Whether process() wrote the NFO, False if it was already up to date
+        self.written = None
+        # Projected instances only decode the containers their configs use
+        self.projected = projected
+        # Large inputs are memory mapped and their entries decoded one by one.
+        # With entries set, an NFO is also written for every playlist entry.
+        self.playlist = None
+        self.entries = entries
+        self.entry_counts = Counter()
+        # Targets are rendered from the same data, each with its resolved
+        # extractor and config as (target, extractor, nfo)
+        self.targets = tuple(targets)
+        self.target_nfos = []
+
+        # The NFO name of an .info.json file is known without reading it
+        if self.path.endswith(".info.json"):
+            self.filename = self.path[:-10]
+
+        # Lazy instances defer all file and config I/O until needed
+        if not lazy:
+            self.load()
+
+    def load(self, raw=None):
+        # Callers that already read the file, e.g. on an I/O thread, pass its bytes
+        if self.loaded:
+            return self.input_ok
+        self.loaded = True
 
         # Read json data
-        if self.input_ok:
-            try:
-                with open(self.path, "rt", encoding="utf-8") as f:
-                    self.data = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError, OSError) as e:
-                if isinstance(e, json.JSONDecodeError):
-                    print(f"Error: Failed to parse JSON in file {self.path}")
+        spans = None
+        try:
+            if raw is None:
+                with stats.timer("read"):
+                    with open(self.path, "rb") as f:
+                        if self.entries or os.fstat(f.fileno()).st_size >= STREAM_SIZE:
+                            self.playlist = Playlist(f)
+                        else:
+                            raw = f.read()
+                stats.add_bytes("read", len(raw) if raw is not None else self.playlist.size)
+            with stats.timer("decode"):
+                if self.playlist is not None:
+                    self.data = self.playlist.read_fields()
+                # A faster backend decodes everything sooner than the json
+                # module decodes the members one by one
+                elif self.projected and backend() == "json":
+                    self.data, spans = read_members(raw)
                 else:
-                    print(f"Error: Failed to read file {self.path}")
-                self.input_ok = False
+                    self.data = loads(raw)
+        except (ValueError, OSError) as e:
+            self.failure = "json" if isinstance(e, ValueError) else "read"
+            if isinstance(e, ValueError):
+                message = "Error: Failed to parse JSON in file %s"
+            else:
+                message = "Error: Failed to read file %s"
+            logger.error(message, self.path, extra={"path": self.path, "kind": self.failure})
+            self.input_ok = False
 
-        if self.extractor is None and self.data is not None:
-            data_extractor = self.data.get("extractor")
-            if isinstance(data_extractor, str):
-                self.extractor = re.sub(r"[:?*/\\]", "_", data_extractor.lower())
+        forced = self.extractor
+        self.extractor = self._resolve(forced, self.config_dir)
 
-        if self.path.endswith(".info.json"):
-            self.filename = self.path[:-10]
-        elif self.data is not None:
+        if self.filename is None and self.data is not None:
             data_filename = self.data.get("_filename")
             if isinstance(data_filename, str):
                 self.filename = os.path.splitext(data_filename)[0]
@@ -41,25 +106,138 @@ class Ytdl_nfo:
             self.filename = self.path
 
         if isinstance(self.extractor, str):
-            self.nfo = get_config(self.extractor, self.path)
-        else:
-            self.nfo = None
+            with stats.timer("config"):
+                self.nfo = get_config(self.extractor, self.path, self.config_dir)
+                for target in self.targets:
+                    # Target directories may resolve to more specific configs
+                    extractor = self._resolve(forced, target.config_dir) or self.extractor
+                    nfo = get_config(extractor, self.path, target.config_dir)
+                    self.target_nfos.append((target, extractor, nfo))
+
+        # Containers are decoded once for every template that reads them
+        fields = frozenset().union(
+            *(nfo.template.fields for nfo in self._nfos() if nfo.template is not None)
+        )
+        if spans and fields:
+            with stats.timer("decode"):
+                self.data.update(decode_spans(raw, spans, fields))
+        if self.playlist is not None and "entries" in fields:
+            if self.playlist.entries_span is not None:
+                with stats.timer("decode"):
+                    self.data["entries"] = self.playlist.load_entries()
+
+        return self.input_ok
+
+    def _resolve(self, forced, config_dir):
+        if forced is not None:
+            return resolve_extractor(extractor=forced, config_dir=config_dir)
+        if self.data is not None:
+            return resolve_extractor(self.data, config_dir=config_dir)
+        return None
+
+    def _nfos(self):
+        if self.nfo is None:
+            return []
+        return [self.nfo] + [nfo for _, _, nfo in self.target_nfos]
 
     def process(self):
-        if not self.input_ok or self.nfo is None or not self.nfo.config_ok():
+        try:
+            generated = self.generate()
+            if generated:
+                self.written = self.write_nfo()
+            if self.entries and self.playlist is not None:
+                self.write_entry_nfos()
+            return generated
+        finally:
+            self.close()
+
+    def generate(self):
+        # Renders the NFO and those of any targets, recording the kind of
+        # failure when one cannot be. Nothing is written unless all render.
+        if not self.load():
+            return False
+        if self.nfo is None:
+            self.failure = "extractor"
+            logger.error(
+                "Error: No extractor found in file %s",
+                self.path,
+                extra={"path": self.path, "kind": self.failure},
+            )
             return False
-        generated = self.nfo.generate(self.data)
-        if generated:
-            self.write_nfo()
-        return generated
+        for nfo in self._nfos():
+            if not nfo.config_ok():
+                self.failure = "config"
+                return False
+            if not nfo.generate(self.data, self.path):
+                self.failure = "config" if nfo.error is not None else "render"
+                return False
+        return True
+
+    def close(self):
+        if self.playlist is not None:
+            self.playlist.close()
+
+    def write_entry_nfos(self):
+        # Entries are rendered with their own extractor's config, next to
+        # their media file when yt-dlp recorded one
+        try:
+            for entry in self.playlist.entries():
+                self.entry_counts[self._write_entry_nfo(entry)] += 1
+        except ValueError:
+            logger.error(
+                "Error: Failed to parse JSON entries in file %s",
+                self.path,
+                extra={"path": self.path, "kind": "json"},
+            )
+            self.entry_counts["failed"] += 1
+        if self.entry_counts:
+            counts = ", ".join(f"{n} {status}" for status, n in sorted(self.entry_counts.items()))
+            logger.info("Entries in %s: %s", self.path, counts, extra={"path": self.path})
+
+    def _write_entry_nfo(self, entry):
+        if not isinstance(entry, dict):
+            return "failed"
+
+        filename = entry.get("_filename")
+        if isinstance(filename, str):
+            filename = os.path.splitext(filename)[0]
+        else:
+            entry_id = re.sub(r'[\\/:*?"<>|]', "_", str(entry.get("id", "")))
+            filename = f"{self.filename}.{entry_id}"
+
+        outputs = [(f"{filename}.nfo", self.config_dir)]
+        outputs += [(f"{filename}.{t.name}.nfo", t.config_dir) for t in self.targets]
+        rendered = []
+        for nfo_path, config_dir in outputs:
+            extractor = resolve_extractor(entry, config_dir=config_dir)
+            if extractor is None:
+                return "failed"
+            nfo = get_config(extractor, self.path, config_dir)
+            if not nfo.config_ok() or not nfo.generate(entry, self.path):
+                return "failed"
+            rendered.append((nfo_path, nfo))
+        written = [nfo.write_nfo(nfo_path) for nfo_path, nfo in rendered]
+        return "written" if any(written) else "unchanged"
 
     def get_nfo_path(self):
+        if self.filename is None:
+            self.load()
         return f"{self.filename}.nfo"
 
+    def get_nfo_paths(self):
+        # The NFO and those of the targets, known as soon as the NFO path is
+        nfo_path = self.get_nfo_path()
+        return [nfo_path] + [f"{self.filename}.{target.name}.nfo" for target in self.targets]
+
+    def outputs(self):
+        # (path, Nfo) for every NFO rendered from this file
+        return list(zip(self.get_nfo_paths(), self._nfos()))
+
     def write_nfo(self):
         if self.nfo is not None and self.nfo.generated_ok():
-            nfo_path = self.get_nfo_path()
-            self.nfo.write_nfo(nfo_path)
+            # Every output is written, rather than stopping at the first change
+            return any([nfo.write_nfo(nfo_path) for nfo_path, nfo in self.outputs()])
+        return False
 
     def print_data(self):
         print(json.dumps(self.data, indent=4, sort_keys=True))
@@ -1,8 +1,13 @@
 import argparse
 import os
-import re
 
-from .Ytdl_nfo import Ytdl_nfo
+from . import atomic, jsonload, log, stats
+from .nfo import render, render_many
+from .scan import PRUNE
+from .Ytdl_nfo import Target, Ytdl_nfo
+
+# A download hook may start ytdl-nfo once per video, so everything not needed
+# to parse the command line is imported by the code path that uses it.
 
 
 def main():
@@ -16,10 +21,25 @@ def main():
     parser.add_argument(
         "--config",
         help="Show the path to the config directory",
-        action="version",
-        version=f"{get_config_path()}",
+        action=_ShowConfigPath,
+    )
+    parser.add_argument(
+        "-c",
+        "--config-dir",
+        help="Directory of YAML configs checked before the bundled configs",
     )
     parser.add_argument("-e", "--extractor", help="Specify specific extractor")
+    parser.add_argument(
+        "-t",
+        "--target",
+        action="append",
+        type=_target,
+        default=[],
+        dest="targets",
+        metavar="NAME=CONFIG_DIR",
+        help="Also write <name>.NAME.nfo with the configs of CONFIG_DIR, rendered from the "
+        "same parse (repeatable)",
+    )
     parser.add_argument(
         "-r",
         "--regex",
@@ -27,9 +47,150 @@ def main():
         default=r".json$",
         help="A regular expression used to search for JSON source files",
     )
+    parser.add_argument(
+        "-x",
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="REGEX",
+        help="Skip JSON files whose name matches this regular expression (repeatable)",
+    )
+    parser.add_argument(
+        "--prune",
+        action="append",
+        default=list(PRUNE),
+        metavar="GLOB",
+        help=f"Do not descend into directories matching this name (repeatable, adds to "
+        f"{', '.join(PRUNE)})",
+    )
+    parser.add_argument(
+        "--follow-symlinks",
+        action="store_true",
+        help="Descend into symlinked directories, converting each file once",
+    )
+    parser.add_argument(
+        "--shard",
+        type=_shard,
+        metavar="I/N",
+        help="Only convert the I-th of N parts of the directory, counting from 1, so N "
+        "runs (e.g. one per machine) split the tree between them",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=["path", "directory"],
+        default="path",
+        help="Split files individually, or whole top level directories to keep locality",
+    )
     parser.add_argument(
         "-w", "--overwrite", action="store_true", help="Overwrite existing NFO files"
     )
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        help="Flush NFOs and their directories to disk in batches, for crash safe bulk imports",
+    )
+    parser.add_argument(
+        "--entries",
+        action="store_true",
+        help="Also write an NFO for every entry of playlist and channel files",
+    )
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        metavar="DB",
+        help="SQLite manifest used to only convert inputs or configs that changed",
+    )
+    parser.add_argument(
+        "--hash-inputs",
+        action="store_true",
+        help="Compare input content hashes when a manifest entry's mtime differs",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=_jobs,
+        default=1,
+        help="Number of worker processes for directories, 0 for one per CPU",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Report results as workers finish instead of in directory order",
+    )
+    parser.add_argument(
+        "--io-concurrency",
+        type=int,
+        metavar="N",
+        help="Pipeline reads and writes with N in flight per mounted filesystem (e.g. NFS/SMB)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and convert JSON files in the directory as they are written",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="Time a watched file must stay unchanged before it is converted",
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        metavar="SECONDS",
+        help="Watch by rescanning at this interval instead of inotify (e.g. for NFS/SMB)",
+    )
+    parser.add_argument(
+        "--json-backend",
+        choices=("auto",) + jsonload.BACKENDS,
+        help=f"JSON decoder to use, the fastest installed by default (or ${jsonload.BACKEND_ENV})",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="count",
+        default=0,
+        help="Also log every processed file",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Only log errors not tied to a file and the failure summary",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Show a progress line with the rate and time left for directories",
+    )
+    parser.add_argument(
+        "--log-json",
+        metavar="FILE",
+        help="Append every log record to FILE as JSON lines, - for stdout",
+    )
+    parser.add_argument(
+        "--stats",
+        choices=["text", "json"],
+        help="Print a report with per-stage timings, file counts and the slowest files",
+    )
+    parser.add_argument(
+        "--stats-prometheus",
+        metavar="FILE",
+        help="Write run statistics to a node_exporter textfile collector file",
+    )
+    parser.add_argument(
+        "--stats-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of slowest files to report",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Write cProfile data for the main process to FILE",
+    )
     parser.add_argument(
         "input",
         metavar="JSON_FILE",
@@ -37,28 +198,292 @@ def main():
         help="JSON file to convert or directory to process recursively",
     )
     args = parser.parse_args()
+    names = [target.name for target in args.targets]
+    if len(set(names)) != len(names):
+        parser.error("--target names must be unique")
+    if args.io_concurrency is not None:
+        if args.io_concurrency < 1:
+            parser.error("--io-concurrency must be a positive number")
+        if args.jobs > 1:
+            parser.error("--io-concurrency cannot be combined with --jobs")
+        if args.entries:
+            parser.error("--io-concurrency cannot be combined with --entries")
+    if args.json_backend is not None:
+        try:
+            jsonload.set_backend(args.json_backend)
+        except ImportError:
+            parser.error(f"JSON backend {args.json_backend} is not installed")
+        # Worker processes resolve their backend from the environment
+        os.environ[jsonload.BACKEND_ENV] = args.json_backend
+
+    console = log.setup(args.verbose, args.quiet, args.log_json)
+    if args.fsync:
+        atomic.enable()
+    collector = None
+    if args.stats or args.stats_prometheus:
+        collector = stats.enable(args.stats_top)
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    if profiler is not None:
+        profiler.enable()
+    try:
+        _run(args, console)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if collector is not None:
+            _report(args, stats.disable())
+        log.shutdown()
 
-    extractor_str = args.extractor if args.extractor is not None else "file specific"
+
+def _run(args, console):
+    from .parallel import convert_file
 
     if os.path.isfile(args.input):
-        print(f"Processing {args.input} with {extractor_str} extractor")
-        file = Ytdl_nfo(args.input, args.extractor)
-        file.process()
+        log.file_done(
+            convert_file(
+                args.input,
+                args.extractor,
+                args.config_dir,
+                entries=args.entries,
+                targets=args.targets,
+            )
+        )
+        atomic.sync(atomic.drain())
+    else:
+        manifest = None
+        if args.manifest:
+            from .manifest import Manifest
+
+            manifest = Manifest(args.manifest, args.hash_inputs)
+        try:
+            if args.watch:
+                _watch_dir(args, manifest)
+            else:
+                _process_dir(args, manifest, console)
+        finally:
+            if manifest is not None:
+                manifest.close()
+
+
+def _report(args, collector):
+    from .nfo import config_cache_info
+
+    collector.finish(config_cache_info(), jsonload.backend())
+
+    if args.stats == "json":
+        print(collector.to_json())
+    elif args.stats == "text":
+        print(collector.to_text())
+
+    if args.stats_prometheus:
+        # Write then rename so the collector never reads a partial file
+        tmp_path = f"{args.stats_prometheus}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(collector.to_prometheus())
+        os.replace(tmp_path, args.stats_prometheus)
+
+
+def _process_dir(args, manifest, console):
+    file_paths = _pending_files(args, manifest)
+    track = manifest is not None
+    summary = log.RunSummary()
+    if args.progress:
+        # The time left needs the number of files, so the scan finishes first
+        file_paths = list(file_paths)
+        summary = log.RunSummary(len(file_paths), console)
+
+    if args.io_concurrency is not None:
+        from .pipeline import run_pipeline
+
+        results = run_pipeline(
+            file_paths,
+            args.io_concurrency,
+            args.extractor,
+            args.config_dir,
+            track,
+            args.hash_inputs,
+            targets=args.targets,
+        )
+    elif args.jobs > 1:
+        from .parallel import run_parallel
+
+        results = run_parallel(
+            file_paths,
+            args.jobs,
+            args.extractor,
+            args.config_dir,
+            track,
+            args.hash_inputs,
+            ordered=not args.unordered,
+            entries=args.entries,
+            targets=args.targets,
+        )
     else:
-        for root, dirs, files in os.walk(args.input):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
-                if file_name.endswith(".live_chat.json"):
-                    continue
-                if re.search(args.regex, file_name):
-                    file = Ytdl_nfo(file_path, args.extractor)
-                    if args.overwrite or not os.path.exists(file.get_nfo_path()):
-                        print(f"Processing {file_path} with {extractor_str} extractor")
-                        file.process()
+        results = _convert_serial(file_paths, args, track)
+
+    batch = atomic.Batch() if args.fsync else None
+    try:
+        for result in results:
+            summary.add(result)
+            _record(manifest, [result] if batch is None else batch.add(result))
+    finally:
+        if batch is not None:
+            _record(manifest, batch.commit())
+    summary.finish()
+
+
+def _record(manifest, results):
+    # Durable runs only record results once their NFOs are on disk
+    for result in results:
+        if result.record is not None:
+            manifest.record(result.path, result.record)
+
+
+def _convert_serial(file_paths, args, track):
+    from .parallel import convert_file
+
+    for file_path in file_paths:
+        yield convert_file(
+            file_path,
+            args.extractor,
+            args.config_dir,
+            track,
+            args.hash_inputs,
+            args.entries,
+            args.targets,
+        )
+
+
+def _watch_dir(args, manifest):
+    from .parallel import convert_file
+    from .watch import Watcher
+
+    scanner = _scanner(args)
+    track = manifest is not None
+
+    def convert(file_path):
+        rel_path = os.path.relpath(file_path, args.input).replace(os.sep, "/")
+        if not scanner.in_shard(rel_path):
+            return
+        result = convert_file(
+            file_path,
+            args.extractor,
+            args.config_dir,
+            track,
+            args.hash_inputs,
+            args.entries,
+            args.targets,
+        )
+        log.file_done(result)
+        # NFOs that failed to sync are converted again on the next event or run
+        failed = atomic.sync(atomic.drain())
+        if result.record is not None and not failed:
+            manifest.record(file_path, result.record)
+            manifest.commit()
+
+    watcher = Watcher(
+        args.input,
+        scanner.accept,
+        convert,
+        args.settle,
+        args.poll,
+        scanner.pruned,
+        args.follow_symlinks,
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def _pending_files(args, manifest):
+    from .parallel import SKIPPED
+    from .scan import nfo_exists
+
+    for found in _scanner(args).scan(args.input):
+        file_path = found.path
+        if args.overwrite:
+            yield file_path
+            continue
+
+        with stats.timer("check"):
+            if manifest is not None:
+                pending = not manifest.is_current(file_path, args.config_dir, args.targets)
+            else:
+                # Skipping existing NFOs only needs the file name for
+                # .info.json inputs, so the JSON is not read unless needed
+                file = Ytdl_nfo(
+                    file_path, args.extractor, args.config_dir, lazy=True, targets=args.targets
+                )
+                pending = not all(nfo_exists(path, found) for path in file.get_nfo_paths())
+        if pending:
+            yield file_path
+        else:
+            stats.file_done(file_path, args.extractor, SKIPPED)
+
+
+def _scanner(args):
+    import re
+
+    from .scan import Scanner, Shard
+
+    shard = None
+    if args.shard is not None:
+        shard = Shard(*args.shard, args.shard_by)
+    try:
+        return Scanner(args.regex, args.exclude, args.prune, args.follow_symlinks, shard)
+    except re.error as e:
+        raise SystemExit(f"Error: Invalid regular expression: {e}") from e
+
+
+def _jobs(value):
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError("must be 0 or a positive number")
+    return jobs or os.cpu_count() or 1
+
+
+def _shard(value):
+    index, sep, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = 0
+    if not sep or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError("must be I/N with 1 <= I <= N")
+    return index - 1, count
+
+
+def _target(value):
+    import re
+
+    name, sep, config_dir = value.partition("=")
+    if not sep or not re.fullmatch(r"[\w-]+", name):
+        raise argparse.ArgumentTypeError("must be NAME=CONFIG_DIR, NAME of letters, digits, _ or -")
+    # An empty directory renders the target with the bundled configs
+    return Target(name, os.path.expanduser(config_dir) or None)
 
 
 def get_config_path():
     return os.path.join(os.path.dirname(__file__), "configs")
 
 
-__all__ = ["main", "Ytdl_nfo", "nfo"]
+class _ShowConfigPath(argparse.Action):
+    # Like action="version", but only looks up the path when asked
+    def __init__(self, option_strings, dest, help=None):
+        super().__init__(option_strings, dest, nargs=0, default=argparse.SUPPRESS, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(get_config_path())
+        parser.exit()
+
+
+__all__ = ["main", "Ytdl_nfo", "nfo", "render", "render_many"]
@@ -0,0 +1,178 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from . import stats
+
+logger = logging.getLogger(__name__)
+
+# Files are written to a temporary file next to their target and renamed
+# over it, so media servers never read a partially written NFO.
+#
+# Durable runs stage writes instead: the renames wait for the parent
+# process to commit a batch, which flushes the staged files to disk
+# together, renames them into place and then syncs each directory once.
+# Per-file fsync is slow on network and copy-on-write filesystems, while
+# concurrent ones are merged into a few commits.
+
+# Staged files are committed every this many results or seconds
+BATCH_SIZE = 500
+BATCH_INTERVAL = 5.0
+
+# Files and directories flushed at once while committing
+SYNC_THREADS = 16
+
+# A temporary file and the NFO it is renamed to once flushed
+Staged = namedtuple("Staged", ["temp", "target"])
+
+# Staged writes of this process, None unless durable writes are enabled
+staging = None
+
+_lock = threading.Lock()
+_counter = itertools.count()
+_O_BINARY = getattr(os, "O_BINARY", 0)
+# Staged files may already carry a read-only mode, which POSIX can flush
+# through a read-only descriptor. Windows needs write access to flush.
+_O_FSYNC = os.O_RDONLY if os.name == "posix" else os.O_RDWR
+
+
+def enable():
+    global staging
+    staging = []
+
+
+def disable():
+    global staging
+    staging = None
+
+
+def drain():
+    global staging
+    if not staging:
+        return None
+    with _lock:
+        staged, staging = staging, []
+    return staged
+
+
+def write_file(filename, data, st=None):
+    # st is the target's stat result, whose permissions the new file keeps
+    directory, name = os.path.split(filename)
+    temp = os.path.join(directory, f".{name}.{os.getpid()}-{next(_counter)}.tmp")
+    fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | _O_BINARY, 0o666)
+    try:
+        with open(fd, "wb") as f:
+            f.write(data)
+        if st is not None:
+            os.chmod(temp, st.st_mode & 0o7777)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+    if staging is None:
+        os.replace(temp, filename)
+    else:
+        with _lock:
+            staging.append(Staged(temp, filename))
+
+
+class Batch:
+    # Collects the results of a durable run and commits their staged files
+    # in batches. Results are handed back once their NFOs are on disk, so
+    # manifest records never get ahead of the files they describe.
+    def __init__(self, size=BATCH_SIZE, interval=BATCH_INTERVAL):
+        self.size = size
+        self.interval = interval
+        self.staged = []
+        self.results = []
+        self.started = time.monotonic()
+
+    def add(self, result):
+        # Returns the results committed by this call, if any
+        if result.staged is not None:
+            self.staged.extend(result.staged)
+        self.results.append(result)
+        if len(self.results) >= self.size or time.monotonic() - self.started >= self.interval:
+            return self.commit()
+        return []
+
+    def commit(self):
+        # Files written by I/O threads of this process are staged here as well
+        self.staged.extend(drain() or ())
+        failed = sync(self.staged)
+        results = self.results
+        if failed:
+            # Results are only recorded when all their NFOs are known to be
+            # in place, which for files staged in this process cannot be told
+            results = [
+                result
+                if result.staged and not failed.intersection(item.target for item in result.staged)
+                else result._replace(record=None)
+                for result in results
+            ]
+        self.staged = []
+        self.results = []
+        self.started = time.monotonic()
+        return results
+
+
+def sync(staged):
+    # Returns the targets that could not be written. A failing file removes
+    # its temporary file and is logged, without holding back the others.
+    failed = set()
+    if not staged:
+        return failed
+    from concurrent.futures import ThreadPoolExecutor
+
+    with stats.timer("sync"):
+        with ThreadPoolExecutor(SYNC_THREADS, thread_name_prefix="ytdl_nfo-sync") as pool:
+            errors = pool.map(_fsync, [item.temp for item in staged])
+            replaced = []
+            for item, error in zip(staged, list(errors)):
+                if error is None:
+                    try:
+                        os.replace(item.temp, item.target)
+                    except OSError as e:
+                        error = e
+                if error is None:
+                    replaced.append(item)
+                else:
+                    _discard(item, error)
+                    failed.add(item.target)
+            # Windows cannot open directories, nor needs them synced for renames
+            if hasattr(os, "O_DIRECTORY"):
+                directories = {os.path.dirname(item.target) or "." for item in replaced}
+                flags = itertools.repeat(os.O_RDONLY | os.O_DIRECTORY)
+                for directory, error in zip(directories, pool.map(_fsync, directories, flags)):
+                    if error is not None:
+                        logger.error("Error: Failed to sync directory %s: %s", directory, error)
+    return failed
+
+
+def _discard(item, error):
+    logger.error(
+        "Error: Failed to write %s: %s",
+        item.target,
+        error,
+        extra={"path": item.target, "kind": "write"},
+    )
+    try:
+        os.unlink(item.temp)
+    except OSError:
+        pass
+
+
+def _fsync(path, flags=_O_FSYNC | _O_BINARY):
+    # Returns the error instead of raising it, for the caller to handle per file
+    try:
+        fd = os.open(path, flags)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        return e
+    return None
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+
+# Parsed YAML configs cached as JSON in the user cache directory. Loading
+# PyYAML and running its pure Python loader costs far more than the rest of
+# converting a single file, so short-lived runs read the cached copy instead.
+# An entry is used only while its source keeps the same mtime and size, so
+# edited configs fall back to the YAML and are cached again.
+
+# Environment variable overriding the cache directory, empty to disable caching
+CACHE_ENV = "YTDL_NFO_CACHE_DIR"
+
+# Bumped when the layout of cache entries changes
+FORMAT = 1
+
+
+def cache_dir():
+    path = os.environ.get(CACHE_ENV)
+    if path is not None:
+        return path or None
+    base = os.environ.get("XDG_CACHE_HOME")
+    if not base and os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA")
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ytdl-nfo")
+
+
+def load_yaml(path):
+    # Return (data, fingerprint) for a YAML config, FileNotFoundError if missing
+    st = os.stat(path)
+    stamp = [st.st_mtime_ns, st.st_size]
+    entry_path = _entry_path(path)
+
+    if entry_path is not None:
+        try:
+            with open(entry_path, "rb") as f:
+                entry = json.load(f)
+            if entry["format"] == FORMAT and entry["stamp"] == stamp:
+                return entry["data"], entry["fingerprint"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    with open(path, "r", encoding="utf-8") as f:
+        data, fingerprint = parse_yaml(f.read())
+
+    if entry_path is not None:
+        _store(entry_path, {"format": FORMAT, "stamp": stamp, "fingerprint": fingerprint}, data)
+    return data, fingerprint
+
+
+def parse_yaml(source):
+    import yaml
+
+    data = yaml.load(source, Loader=yaml.FullLoader)
+    return data, hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _entry_path(path):
+    directory = cache_dir()
+    if directory is None:
+        return None
+    path = os.path.abspath(path)
+    digest = hashlib.sha256(path.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    return os.path.join(directory, "configs", f"{digest}-{os.path.basename(path)}.json")
+
+
+def _store(entry_path, entry, data):
+    # Configs JSON cannot represent exactly (dates, non-string keys) stay uncached
+    try:
+        dumped = json.dumps(dict(entry, data=data))
+        if json.loads(dumped)["data"] != data:
+            return
+    except (TypeError, ValueError):
+        return
+
+    # Written then renamed so concurrent runs never read a partial entry
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(dumped)
+        os.replace(tmp_path, entry_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
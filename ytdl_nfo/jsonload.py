@@ -0,0 +1,61 @@
+import importlib
+import json
+import os
+
+# Decoders tried in order when no backend is forced
+BACKENDS = ("orjson", "msgspec", "json")
+
+# Environment variable forcing a backend, also seen by worker processes
+BACKEND_ENV = "YTDL_NFO_JSON"
+
+_backend = None
+_backend_loads = None
+
+
+def backend():
+    # Name of the active decoder, resolved on first use
+    if _backend is None:
+        set_backend(os.environ.get(BACKEND_ENV) or None)
+    return _backend
+
+
+def set_backend(name=None):
+    # Force a backend by name, or pick the fastest installed one for None/"auto".
+    # Raises ImportError if a forced backend is not installed.
+    global _backend, _backend_loads
+    if name in (None, "auto"):
+        for candidate in BACKENDS:
+            try:
+                _backend_loads = _import_loads(candidate)
+            except ImportError:
+                continue
+            _backend = candidate
+            return _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend {name}, expected one of {', '.join(BACKENDS)}")
+    _backend_loads = _import_loads(name)
+    _backend = name
+    return _backend
+
+
+def loads(raw):
+    # Decode a whole document from bytes. Documents a faster backend rejects
+    # (NaN, lone surrogates, malformed input) are decoded again by the json
+    # module, so what is accepted and the errors raised match the stdlib.
+    if _backend is None:
+        backend()
+    if _backend_loads is not json.loads:
+        try:
+            return _backend_loads(raw)
+        except ValueError:
+            pass
+    return json.loads(raw)
+
+
+def _import_loads(name):
+    if name == "json":
+        return json.loads
+    module = importlib.import_module(name)
+    if name == "msgspec":
+        return module.json.Decoder().decode
+    return module.loads
@@ -0,0 +1,274 @@
+import json
+import logging
+import sys
+import time
+from collections import Counter
+
+# Logging for the command line. Modules log through children of the ytdl_nfo
+# logger and main() attaches the handlers. Records about a single file carry
+# its path, and failures their kind, as extra fields for the JSON lines log.
+
+logger = logging.getLogger("ytdl_nfo")
+
+# Extra record attributes written to the JSON lines log
+FIELDS = ("path", "extractor", "status", "kind")
+
+# Output that is not a terminal is flushed at most this often, in seconds,
+# unless a warning or error is logged. Flushing every line costs a write per
+# file on pipes and journald.
+FLUSH_INTERVAL = 1.0
+
+# Seconds between progress updates on a terminal, and as lines elsewhere
+PROGRESS_INTERVAL = 0.2
+PROGRESS_LINE_INTERVAL = 10.0
+
+
+def setup(verbosity=0, quiet=False, log_json=None):
+    # Returns the console handler, which also draws the progress line
+    console = _Console(sys.stderr)
+    if verbosity:
+        console.setLevel(logging.DEBUG)
+    elif quiet:
+        # Per-file errors are still counted in the run summary
+        console.setLevel(logging.WARNING)
+        console.addFilter(_not_per_file)
+    else:
+        console.setLevel(logging.INFO)
+    handlers = [console]
+
+    if log_json is not None:
+        if log_json == "-":
+            handler = _BufferedHandler(sys.stdout)
+        else:
+            handler = _BufferedHandler(open(log_json, "a", encoding="utf-8"), owned=True)
+        handler.setLevel(logging.DEBUG)
+        handler.setFormatter(_JsonFormatter())
+        handlers.append(handler)
+
+    for handler in handlers:
+        logger.addHandler(handler)
+    logger.setLevel(min(handler.level for handler in handlers))
+    return console
+
+
+def shutdown():
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.setLevel(logging.NOTSET)
+
+
+def file_done(result):
+    logger.debug(
+        "Processed %s with %s extractor: %s",
+        result.path,
+        result.extractor or "no",
+        result.status,
+        extra={
+            "path": result.path,
+            "extractor": result.extractor,
+            "status": result.status,
+            "kind": result.error,
+        },
+    )
+
+
+class RunSummary:
+    # Counts the results of a run, optionally showing progress towards total
+    def __init__(self, total=None, console=None):
+        self.total = total
+        self.console = console
+        self.counts = Counter()
+        self.failures = Counter()
+        self.started = time.monotonic()
+        self.next_update = self.started
+        if console is not None:
+            self.interval = PROGRESS_INTERVAL if console.tty else PROGRESS_LINE_INTERVAL
+
+    def add(self, result):
+        file_done(result)
+        self.counts[result.status] += 1
+        if result.error is not None:
+            self.failures[result.error, result.extractor or "unknown"] += 1
+
+        if self.console is not None:
+            now = time.monotonic()
+            if now >= self.next_update:
+                self.next_update = now + self.interval
+                self.console.status(self.progress(now))
+
+    def progress(self, now):
+        done = sum(self.counts.values())
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        line = f"{done}"
+        if self.total is not None:
+            line += f"/{self.total} files ({done * 100 // (self.total or 1)}%)"
+        else:
+            line += " files"
+        line += f", {rate:.0f} files/s"
+        if self.total is not None and rate > 0:
+            line += f", ETA {_duration((self.total - done) / rate)}"
+        failed = self.counts["failed"]
+        if failed:
+            line += f", {failed} failed"
+        return line
+
+    def finish(self):
+        if self.console is not None:
+            self.console.status(self.progress(time.monotonic()))
+            self.console.end_status()
+        logger.info(
+            "%d written, %d unchanged, %d failed",
+            self.counts["written"],
+            self.counts["unchanged"],
+            self.counts["failed"],
+        )
+
+        by_kind = {}
+        for (kind, extractor), count in self.failures.items():
+            by_kind.setdefault(kind, Counter())[extractor] = count
+        for kind, extractors in sorted(by_kind.items()):
+            logger.warning(
+                "%s errors: %d (%s)",
+                kind,
+                sum(extractors.values()),
+                ", ".join(f"{extractor} {count}" for extractor, count in extractors.most_common()),
+            )
+
+
+# Worker processes keep their records and return them with each result, for
+# the parent to replay through its own handlers
+
+
+def init_worker(level):
+    # Forked workers inherit the parent's handlers along with their
+    # unwritten buffers, so those are swapped for the capture
+    logger.handlers = [_CAPTURE]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def drain():
+    records, _CAPTURE.records = _CAPTURE.records, []
+    return records or None
+
+
+def replay(records):
+    for record in records:
+        logger.handle(record)
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Arguments and tracebacks may not pickle, the formatted message does
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+_CAPTURE = _Capture()
+
+
+class _BufferedHandler(logging.StreamHandler):
+    def __init__(self, stream, owned=False):
+        super().__init__(stream)
+        self.owned = owned
+        self.tty = _isatty(stream)
+        self.interval = 0 if self.tty else FLUSH_INTERVAL
+        self.flushed = time.monotonic()
+
+    def emit(self, record):
+        # StreamHandler.emit flushes after every record
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if record.levelno >= logging.WARNING or time.monotonic() - self.flushed >= self.interval:
+            self.flush()
+
+    def flush(self):
+        super().flush()
+        self.flushed = time.monotonic()
+
+    def close(self):
+        self.flush()
+        if self.owned:
+            self.stream.close()
+        super().close()
+
+
+class _Console(_BufferedHandler):
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.status_line = None
+
+    def emit(self, record):
+        # Records are written above the progress line, which is then redrawn
+        if self.status_line is None:
+            super().emit(record)
+            return
+        self.stream.write("\r\x1b[K")
+        super().emit(record)
+        self.stream.write(self.status_line)
+        self.flush()
+
+    def status(self, line):
+        self.acquire()
+        try:
+            if self.tty:
+                self.status_line = line
+                self.stream.write(f"\r{line}\x1b[K")
+            else:
+                self.stream.write(line + self.terminator)
+            self.flush()
+        finally:
+            self.release()
+
+    def end_status(self):
+        self.acquire()
+        try:
+            if self.status_line is not None:
+                self.stream.write(self.terminator)
+                self.status_line = None
+                self.flush()
+        finally:
+            self.release()
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _not_per_file(record):
+    return getattr(record, "path", None) is None
+
+
+def _isatty(stream):
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+from .nfo import load_config
+
+# Rows are committed in batches to keep SQLite transactions cheap
+COMMIT_INTERVAL = 500
+
+Stamp = namedtuple("Stamp", ["size", "mtime_ns", "input_hash"])
+Record = namedtuple(
+    "Record", ["size", "mtime_ns", "input_hash", "extractor", "config", "nfo_path", "output_hash"]
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    input_hash TEXT,
+    extractor TEXT NOT NULL,
+    config TEXT NOT NULL,
+    nfo_path TEXT NOT NULL,
+    output_hash TEXT NOT NULL
+)
+"""
+
+
+def stamp_input(file_path, hash_inputs=False):
+    st = os.stat(file_path)
+    input_hash = hash_file(file_path) if hash_inputs else None
+    return Stamp(st.st_size, st.st_mtime_ns, input_hash)
+
+
+def hash_file(file_path):
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def make_record(file, stamp):
+    # Build the manifest row for a processed Ytdl_nfo, None if nothing was written
+    if file.nfo is None or file.nfo.output_hash is None:
+        return None
+    nfo_path = os.path.abspath(file.get_nfo_path())
+    # Targets add a line per config to the fingerprint of the NFO's config
+    config = "\n".join(
+        [file.nfo.fingerprint]
+        + [f"{t.name}={extractor}:{nfo.fingerprint}" for t, extractor, nfo in file.target_nfos]
+    )
+    return Record(*stamp, file.extractor, config, nfo_path, file.nfo.output_hash)
+
+
+class Manifest:
+    """Record of converted inputs used to skip files that have not changed.
+
+    An input is current when its size and mtime (or content hash) match the
+    last conversion, its extractor configs are unchanged and its NFOs exist.
+    """
+
+    def __init__(self, path, hash_inputs=False):
+        import sqlite3
+
+        self.hash_inputs = hash_inputs
+        # Process pools consume pending files from a feeder thread, so
+        # access is serialized with a lock instead of per-thread connections
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(_SCHEMA)
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_current(self, file_path, config_dir=None, targets=()):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT * FROM files WHERE path = ?", (os.path.abspath(file_path),)
+            ).fetchone()
+        if row is None:
+            return False
+        record = Record(*row[1:])
+
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        if (st.st_size, st.st_mtime_ns) != (record.size, record.mtime_ns):
+            # Touched files with identical content are still current
+            if not self.hash_inputs or record.input_hash is None:
+                return False
+            if st.st_size != record.size:
+                return False
+            try:
+                if hash_file(file_path) != record.input_hash:
+                    return False
+            except OSError:
+                return False
+            self.record(file_path, record._replace(mtime_ns=st.st_mtime_ns))
+
+        fingerprint, *target_configs = record.config.split("\n")
+        config = load_config(record.extractor, file_path, config_dir)
+        if config.fingerprint != fingerprint:
+            return False
+        recorded = dict(line.split("=", 1) for line in target_configs)
+        if recorded.keys() != {target.name for target in targets}:
+            return False
+        base = record.nfo_path[: -len(".nfo")]
+        for target in targets:
+            extractor, _, fingerprint = recorded[target.name].rpartition(":")
+            config = load_config(extractor, file_path, target.config_dir)
+            if str(config.fingerprint) != fingerprint:
+                return False
+            if not os.path.exists(f"{base}.{target.name}.nfo"):
+                return False
+        return os.path.exists(record.nfo_path)
+
+    def record(self, file_path, record):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(file_path), *record),
+            )
+            self.pending += 1
+            if self.pending >= COMMIT_INTERVAL:
+                self.db.commit()
+                self.pending = 0
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+            self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
@@ -1,24 +1,27 @@
-import ast
-import datetime as dt
+import hashlib
+import logging
+import os
+import re
+import string
+import threading
 import xml.etree.ElementTree as ET
-from collections import defaultdict
-from importlib.resources import files  # nosemgrep: python.lang.compatibility.python37.python37-compatibility-importlib2
-from xml.dom import minidom
+from collections import defaultdict, namedtuple
 
-import yaml
+from . import atomic, stats
+from .configcache import load_yaml, parse_yaml
+
+logger = logging.getLogger(__name__)
 
 
 class Nfo:
-    def __init__(self, extractor, file_path):
-        self.data = None
+    def __init__(self, extractor, file_path, config_dir=None):
+        config = load_config(extractor, file_path, config_dir)
+        self.data = config.data
+        self.template = config.template
+        self.error = config.error
+        self.fingerprint = config.fingerprint
         self.top = None
-        try:
-            extractor_path = f"configs/{extractor}.yaml"
-            config_file = files("ytdl_nfo").joinpath(extractor_path)
-            with config_file.open("r") as f:
-                self.data = yaml.load(f, Loader=yaml.FullLoader)
-        except FileNotFoundError:
-            print(f"Error: No config available for extractor {extractor} in file {file_path}")
+        self.output_hash = None
 
     def config_ok(self):
         return self.data is not None
@@ -26,112 +29,583 @@ class Nfo:
     def generated_ok(self):
         return self.top is not None
 
-    def generate(self, raw_data):
-        # There should only be one top level node
-        top_name = list(self.data.keys())[0]
-        self.top = ET.Element(top_name)
+    def generate(self, raw_data, file_path=None):
+        self.top = None
+        if self.error is not None:
+            logger.error("%s", self.error, extra={"path": file_path, "kind": "config"})
+            return False
 
-        # Recursively generate the rest of the NFO
         try:
-            self.__create_child(self.top, self.data[top_name], raw_data)
+            with stats.timer("render"):
+                self.top = self.template.render(raw_data)
         except ValueError as e:
-            print(e)
+            logger.error("%s", e, extra={"path": file_path, "kind": "render"})
             return False
 
         return True
 
-    def __create_child(self, parent, subtree, raw_data):
-        # Some .info.json files may not include an upload_date.
-        if raw_data.get("upload_date") is None:
-            date = dt.datetime.fromtimestamp(raw_data["epoch"])
-            raw_data["upload_date"] = date.strftime("%Y%m%d")
+    def print_nfo(self):
+        print(to_xml(self.top))
+
+    def write_nfo(self, filename):
+        return write_if_changed(filename, self.serialize())
+
+    def serialize(self):
+        with stats.timer("serialize"):
+            xmlstr = to_xml(self.top)
+            # Keep the platform line endings text mode writes used to produce
+            if os.linesep != "\n":
+                xmlstr = xmlstr.replace("\n", os.linesep)
+            data = xmlstr.encode("utf-8")
+            self.output_hash = hashlib.sha256(data).hexdigest()
+        return data
+
+    def get_nfo(self):
+        return to_xml(self.top)
+
+
+class Template:
+    """Render plan compiled once from an extractor config.
+
+    Node paths, format strings, attribute templates and converters are all
+    resolved up front, so rendering a record only walks the compiled nodes.
+    """
 
+    __slots__ = ("name", "nodes", "fields")
+
+    def __init__(self, config):
+        # There should only be one top level node
+        self.name = next(iter(config))
+        self.nodes = tuple(_compile_nodes(config[self.name]))
+
+        # Top level info.json keys the plan reads, upload_date may fall back to epoch
+        self.fields = frozenset().union(
+            {"upload_date", "epoch"}, *(node.fields for node in self.nodes)
+        )
+
+    def render(self, raw_data):
         # Allow missing keys to give an empty string instead of
         # a KeyError when formatting values
         # https://stackoverflow.com/a/21754294
-        format_dict = defaultdict(lambda: "")
-        format_dict.update(raw_data)
+        format_dict = defaultdict(str, raw_data)
+
+        # Some .info.json files may not include an upload_date.
+        if raw_data.get("upload_date") is None:
+            if raw_data.get("epoch") is None:
+                raise ValueError("Error: No upload_date or epoch available")
+            from datetime import datetime
+
+            date = datetime.fromtimestamp(raw_data["epoch"])
+            format_dict["upload_date"] = date.strftime("%Y%m%d")
 
-        # Check if current node is a list
-        if isinstance(subtree, list):
-            # Process individual nodes
-            for child in subtree:
-                self.__create_child(parent, child, raw_data)
-            return
+        top = ET.Element(self.name)
+        for node in self.nodes:
+            node.render(top, format_dict)
+        return top
 
-        # Process data in child node
-        child_name = list(subtree.keys())[0]
 
-        table = child_name[-1] == "!"
+class _Node:
+    __slots__ = ("parents", "name", "table", "value", "attr", "convert", "fields")
 
-        attributes = {}
-        children = []
+    def __init__(self, key, spec):
+        self.table = key[-1] == "!"
+        key = key.rstrip("!")
+        *parents, self.name = key.split(">")
+        if parents and not self.table:
+            raise ValueError(f"Error with key {key}: > deliminator can only be used for lists")
+        self.parents = tuple(parents)
+        self.attr = ()
+        self.convert = None
 
         # Check if attributes are present
-        if isinstance(subtree[child_name], dict):
-            attributes = subtree[child_name]
-            value = subtree[child_name]["value"]
+        if isinstance(spec, dict):
+            self.value = _Value(spec["value"])
+            self.fields = set(self.value.fields)
+            if "attr" in spec:
+                self.attr = tuple(
+                    (attribute, _Value(attr_value).format)
+                    for attribute, attr_value in spec["attr"].items()
+                )
+                for attr_value in spec["attr"].values():
+                    self.fields |= _format_fields(attr_value)
+            if "convert" in spec:
+                converter = _CONVERTERS.get(spec["convert"])
+                if converter is not None:
+                    self.convert = converter(spec["input_f"], spec["output_f"])
+        # Value only
+        else:
+            self.value = _Value(spec)
+            self.fields = set(self.value.fields)
+
+    def render(self, parent, format_dict):
+        if self.table:
+            values = self.value.items(format_dict)
+        else:
+            values = [self.value.format(format_dict)]
+
+        if self.convert is not None:
+            values = [self.convert(value) for value in values]
+
+        # Add the child node(s)
+        for value in values:
+            sub_parent = parent
+            for name in self.parents:
+                sub_parent = ET.SubElement(sub_parent, name)
+
+            child = ET.SubElement(sub_parent, self.name)
+            child.text = value
+
+            for attribute, attr_value in self.attr:
+                child.set(attribute, attr_value(format_dict))
+
+
+def _compile_nodes(subtree):
+    # Lists may be nested, flatten them into a single run of nodes
+    if isinstance(subtree, list):
+        for child in subtree:
+            yield from _compile_nodes(child)
+        return
+
+    child_name = next(iter(subtree))
+    yield _Node(child_name, subtree[child_name])
+
+
+def _format_fields(format_string):
+    # Top level names referenced by a format string, e.g. "a" for "{a[0].b}"
+    return {
+        re.split(r"[.\[|]", field_name, maxsplit=1)[0]
+        for _, field_name, _, _ in string.Formatter().parse(format_string)
+        if field_name
+    }
+
+
+class _Value:
+    # A compiled format string. A string that is only a field reference, e.g.
+    # "{categories}", reads the value itself, so list nodes iterate it as is.
+    # Field references may look up nested values, "{thumbnails[-1][url]}" or
+    # "{thumbnails[-1].url}", and give a default for missing or null values
+    # after a |, e.g. "{channel_follower_count|0}". Missing values without a
+    # default are empty. Strings of plain names are formatted by format_map.
+    __slots__ = ("format", "lookup", "fields", "parts")
+
+    def __init__(self, format_string):
+        parsed = list(string.Formatter().parse(format_string))
+        self.fields = _format_fields(format_string)
+        self.lookup = None
+        self.parts = None
+        self.format = format_string.format_map
+
+        if len(parsed) == 1 and not parsed[0][0] and parsed[0][1] and not any(parsed[0][2:]):
+            self.lookup = _Lookup(parsed[0][1])
+            self.format = self._format_lookup
+        elif any(field and not _PLAIN_FIELD.fullmatch(field) for _, field, _, _ in parsed):
+            self.parts = tuple(
+                (literal, _Lookup(field) if field is not None else None, conversion, spec)
+                for literal, field, spec, conversion in parsed
+            )
+            self.format = self._format_parts
+
+    def items(self, format_dict):
+        # Values of a list node, one child is added per value
+        if self.lookup is None:
+            # Lists built up from text, e.g. "[{a}, {b}]", are parsed back
+            import ast
+
+            return ast.literal_eval(self.format(format_dict))
+        value = self.lookup.get(format_dict)
+        if isinstance(value, (list, tuple)):
+            return [_text(item) for item in value]
+        if value is _MISSING or value is None:
+            return [] if self.lookup.default is None else [self.lookup.default]
+        return [_text(value)]
+
+    def _format_lookup(self, format_dict):
+        return _text(self.lookup.value(format_dict))
+
+    def _format_parts(self, format_dict):
+        out = []
+        for literal, lookup, conversion, spec in self.parts:
+            out.append(literal)
+            if lookup is not None:
+                value = lookup.value(format_dict)
+                if conversion:
+                    value = _CONVERSIONS[conversion](value)
+                out.append(format(value, spec))
+        return "".join(out)
+
+
+class _Lookup:
+    __slots__ = ("name", "keys", "default")
+
+    def __init__(self, field_name):
+        path, sep, default = field_name.partition("|")
+        self.default = default if sep else None
+        match = _FIELD_NAME.match(path)
+        self.name = match.group()
+        keys = []
+        pos = match.end()
+        while pos < len(path):
+            match = _FIELD_KEY.match(path, pos)
+            if match is None:
+                raise ValueError(f"Error with field {field_name}: invalid lookup")
+            key = match.group(1) if match.group(1) is not None else match.group(2)
+            # Unlike format strings, negative indexes count from the end
+            keys.append(int(key) if _INDEX.fullmatch(key) else key)
+            pos = match.end()
+        self.keys = tuple(keys)
+
+    def get(self, data):
+        # The value referenced, or _MISSING
+        value = data.get(self.name, _MISSING)
+        for key in self.keys:
+            try:
+                value = value[key]
+            except (LookupError, TypeError):
+                return _MISSING
+        return value
+
+    def value(self, data):
+        # Like format_map with a defaultdict, missing values are empty and
+        # nulls print as None, unless there is a default
+        value = self.get(data)
+        if value is _MISSING or (value is None and self.default is not None):
+            return self.default if self.default is not None else ""
+        return value
+
+
+def _text(value):
+    return value if isinstance(value, str) else format(value, "")
+
+
+_MISSING = object()
+_PLAIN_FIELD = re.compile(r"\w+")
+_FIELD_NAME = re.compile(r"[^.\[]*")
+_FIELD_KEY = re.compile(r"\.([^.\[]+)|\[([^\]]+)\]")
+_INDEX = re.compile(r"-?\d+")
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+
+def _date_converter(input_f, output_f):
+    from datetime import datetime
+
+    def convert(value):
+        return datetime.strptime(value, input_f).strftime(output_f)
+
+    return convert
+
+
+_CONVERTERS = {"date": _date_converter}
+
 
-            # Set children if value flag
-            if table:
-                children = ast.literal_eval(value.format_map(format_dict))
+def write_if_changed(filename, data):
+    with stats.timer("write"):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            st = None
+        # Leave identical files untouched so media servers do not rescan them
+        if st is not None and _same_content(filename, st, data):
+            return False
+        atomic.write_file(filename, data, st)
+    stats.add_bytes("written", len(data))
+    return True
+
+
+def _same_content(filename, st, data):
+    if st.st_size != len(data):
+        return False
+    try:
+        with open(filename, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def to_xml(element):
+    # Pretty print an element exactly like minidom's toprettyxml(indent="    ")
+    # did after a round trip through ET.tostring, without building a DOM
+    parts = ['<?xml version="1.0" ?>\n']
+    _write_element(parts.append, element, "")
+    return "".join(parts)
+
+
+def _write_element(write, element, indent):
+    tag = element.tag
+    write(f"{indent}<{tag}")
+    for name, value in element.items():
+        write(f' {name}="{_escape_attr(value)}"')
+
+    # The XML parser normalized line endings in text content
+    text = element.text
+    if text:
+        text = _escape_text(text.replace("\r\n", "\n").replace("\r", "\n"))
+
+    if not len(element):
+        write(f">{text}</{tag}>\n" if text else "/>\n")
+        return
+
+    write(">\n")
+    child_indent = indent + "    "
+    if text:
+        write(f"{child_indent}{text}\n")
+    for child in element:
+        _write_element(write, child, child_indent)
+    write(f"{indent}</{tag}>\n")
+
+
+def _escape_text(text):
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _escape_attr(text):
+    text = _escape_text(text)
+    if '"' in text:
+        text = text.replace('"', "&quot;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#9;")
+    return text
+
+
+def render(info_dict, extractor=None, config_dir=None):
+    """Render an info dict to NFO bytes without touching the filesystem.
+
+    The extractor defaults to the one recorded in the info dict. Compiled
+    configs come from the process-wide cache and no state is kept between
+    calls, so this is safe to call from several threads.
+    """
+    extractor = resolve_extractor(info_dict, extractor, config_dir)
+    if extractor is None:
+        raise ValueError("Error: No extractor given or found in info dict")
+
+    config = load_config(extractor, config_dir=config_dir)
+    if config.data is None:
+        raise ValueError(f"Error: No config available for extractor {extractor}")
+    if config.error is not None:
+        raise ValueError(config.error)
+    return to_xml(config.template.render(info_dict)).encode("utf-8")
+
+
+def render_many(info_dicts, extractor=None, config_dir=None):
+    # Yields NFO bytes per info dict, or None for dicts that failed to render
+    for info_dict in info_dicts:
+        try:
+            yield render(info_dict, extractor, config_dir)
+        except ValueError as e:
+            logger.error("%s", e, extra={"kind": "render"})
+            yield None
+
+
+def extractor_name(info_dict):
+    # Config name for the extractor recorded by yt-dlp, e.g. twitch_vod for "twitch:vod"
+    extractor = info_dict.get("extractor")
+    if isinstance(extractor, str):
+        return re.sub(r"[:?*/\\]", "_", extractor.lower())
+    return None
+
+
+# Extractor names and keys whose config is named differently, after
+# normalization. yt-dlp extractor keys are CamelCase class names.
+ALIASES = {
+    "youtubetab": "youtube_tab",
+    "youtube_playlist": "youtube_tab",
+    "youtubeplaylist": "youtube_tab",
+    "twitchvod": "twitch_vod",
+    "twitchclips": "twitch_clips",
+    "nebula": "nebula_video",
+    "nebulachannel": "nebula_channel",
+}
+
+# Config used for extractors nothing else matches, if one by this name exists
+DEFAULT_CONFIG = "default"
+
+_resolved = {}
+_config_names = {}
+
+
+def resolve_extractor(info_dict=None, extractor=None, config_dir=None):
+    """Return the config name for an extractor, or for an info dict.
+
+    An explicit extractor is tried as is, through ALIASES and by the part
+    before its first ":" (youtube:shorts uses youtube). For info dicts the
+    recorded extractor is tried the same way, then extractor_key (ie_key for
+    flat playlist entries) and finally the default config. Results are
+    cached, so each distinct extractor is resolved once. When nothing
+    matches, the normalized name is returned so loading it reports the
+    missing config.
+    """
+    if extractor is not None:
+        key = (extractor, None, True)
+    elif info_dict is not None:
+        extractor_key = info_dict.get("extractor_key") or info_dict.get("ie_key")
+        key = (info_dict.get("extractor"), extractor_key, False)
+    else:
+        return None
+
+    names = _available_configs(config_dir)
+    cache_key = (config_dir, names, key)
+    name = _resolved.get(cache_key)
+    if name is None:
+        name = _resolve(*key, names)
+        _resolved[cache_key] = name
+    return name or None
+
+
+def _resolve(extractor, extractor_key, forced, names):
+    candidates = []
+    if isinstance(extractor, str):
+        candidates.append(extractor_name({"extractor": extractor}))
+    if isinstance(extractor_key, str) and not forced:
+        candidates.append(extractor_name({"extractor": extractor_key}))
+    if isinstance(extractor, str) and ":" in extractor:
+        candidates.append(extractor_name({"extractor": extractor.split(":", 1)[0]}))
+    if not forced:
+        candidates.append(DEFAULT_CONFIG)
+
+    for candidate in candidates:
+        for name in (candidate, ALIASES.get(candidate)):
+            if name in names:
+                return name
+    # Cached as "" so unknown extractors are not resolved again
+    return candidates[0] if candidates[0] != DEFAULT_CONFIG else ""
+
+
+def _available_configs(config_dir):
+    # Names of the bundled configs plus those in config_dir. The listing of a
+    # user directory is reused until the directory changes.
+    stamp = None
+    if config_dir is not None:
+        try:
+            stamp = os.stat(config_dir).st_mtime_ns
+        except OSError:
+            pass
+    cached = _config_names.get(config_dir)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    names = set(_list_configs(_BUNDLED_DIR))
+    if stamp is not None:
+        names.update(_list_configs(config_dir))
+    names = frozenset(names)
+    _config_names[config_dir] = (stamp, names)
+    return names
+
+
+def _list_configs(directory):
+    try:
+        file_names = os.listdir(directory)
+    except OSError:
+        if directory != _BUNDLED_DIR:
+            return []
+        file_names = [entry.name for entry in _bundled_resources().iterdir()]
+    return [name[:-5] for name in file_names if name.endswith(".yaml")]
+
+
+def get_config(extractor, file_path, config_dir=None):
+    return Nfo(extractor, file_path, config_dir)
+
+
+# Process-wide cache of compiled configs keyed by (config_dir, extractor).
+# Extractors without a config are cached too so they only fail once.
+_Config = namedtuple("_Config", ["stamp", "data", "template", "error", "fingerprint"])
+ConfigCacheInfo = namedtuple("ConfigCacheInfo", ["hits", "misses", "negative_hits", "size"])
+
+_BUNDLED_DIR = os.path.join(os.path.dirname(__file__), "configs")
+
+_config_cache = {}
+_cache_lock = threading.Lock()
+_cache_counts = {"hits": 0, "misses": 0, "negative_hits": 0}
+
+
+def load_config(extractor, file_path=None, config_dir=None):
+    user_path = None
+    stamp = None
+    if config_dir is not None:
+        # User configs are re-read when they are added, removed or modified
+        user_path = os.path.join(config_dir, f"{extractor}.yaml")
+        try:
+            st = os.stat(user_path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            user_path = None
+
+    key = (config_dir, extractor)
+    with _cache_lock:
+        config = _config_cache.get(key)
+        if config is not None and config.stamp == stamp:
+            if config.data is None:
+                _cache_counts["negative_hits"] += 1
             else:
-                children = [value.format_map(format_dict)]
+                _cache_counts["hits"] += 1
+            return config
 
-            if "convert" in attributes.keys():
-                target_type = attributes["convert"]
-                input_f = attributes["input_f"]
-                output_f = attributes["output_f"]
+        _cache_counts["misses"] += 1
+        config = _read_config(extractor, file_path, user_path, stamp)
+        _config_cache[key] = config
+        return config
 
-                for i in range(len(children)):
-                    if target_type == "date":
-                        date = dt.datetime.strptime(children[i], input_f)
-                        children[i] = date.strftime(output_f)
 
-        # Value only
+def _read_config(extractor, file_path, user_path, stamp):
+    data = None
+    fingerprint = None
+    try:
+        if user_path is not None:
+            data, fingerprint = load_yaml(user_path)
+        elif os.path.isdir(_BUNDLED_DIR):
+            data, fingerprint = load_yaml(os.path.join(_BUNDLED_DIR, f"{extractor}.yaml"))
         else:
-            if table:
-                children = ast.literal_eval(subtree[child_name].format_map(format_dict))
-            else:
-                children = [subtree[child_name].format_map(format_dict)]
+            # Zipped installs have no config files, nor stamps to check a cache against
+            resource = _bundled_resources().joinpath(f"{extractor}.yaml")
+            with resource.open("r", encoding="utf-8") as f:
+                data, fingerprint = parse_yaml(f.read())
+    except FileNotFoundError:
+        fields = {"path": file_path, "extractor": extractor, "kind": "config"}
+        if file_path is None:
+            logger.error("Error: No config available for extractor %s", extractor, extra=fields)
+        else:
+            logger.error(
+                "Error: No config available for extractor %s in file %s",
+                extractor,
+                file_path,
+                extra=fields,
+            )
 
-        # Add the child node(s)
-        child_name = child_name.rstrip("!")
+    template = None
+    error = None
+    if data is not None:
+        try:
+            template = Template(data)
+        except ValueError as e:
+            # Only the message is cached, an exception would pile up the
+            # tracebacks of every call raising it, and their frames
+            error = str(e)
 
-        for value in children:
-            sub_parent = parent
-            sub_name = child_name
-            sub_index = sub_name.find(">")
-            while sub_index > -1:
-                if not table:
-                    raise ValueError(
-                        f"Error with key {sub_name}: > deliminator can only be used for lists"
-                    )
-                sub_parent = ET.SubElement(sub_parent, sub_name[:sub_index])
-                sub_name = sub_name[sub_index + 1 :]
-                sub_index = sub_name.find(">")
-
-            child = ET.SubElement(sub_parent, sub_name)
-            child.text = value
+    return _Config(stamp, data, template, error, fingerprint)
 
-            # Add attributes
-            if "attr" in attributes.keys():
-                for attribute, attr_value in attributes["attr"].items():
-                    child.set(attribute, attr_value.format_map(format_dict))
 
-    def print_nfo(self):
-        xmlstr = minidom.parseString(ET.tostring(self.top, "utf-8")).toprettyxml(indent="    ")
-        print(xmlstr)
+def _bundled_resources():
+    # Only zipped installs need importlib.resources, so it is imported here
+    from importlib.resources import files  # nosemgrep: python.lang.compatibility.python37.python37-compatibility-importlib2
 
-    def write_nfo(self, filename):
-        xmlstr = minidom.parseString(ET.tostring(self.top, "utf-8")).toprettyxml(indent="    ")
-        with open(filename, "wt", encoding="utf-8") as f:
-            f.write(xmlstr)
+    return files("ytdl_nfo").joinpath("configs")
 
-    def get_nfo(self):
-        xmlstr = minidom.parseString(ET.tostring(self.top, "utf-8")).toprettyxml(indent="    ")
-        return xmlstr
+
+def config_cache_info():
+    return ConfigCacheInfo(size=len(_config_cache), **_cache_counts)
 
 
-def get_config(extractor, file_path):
-    return Nfo(extractor, file_path)
+def clear_config_cache():
+    _config_cache.clear()
+    _resolved.clear()
+    _config_names.clear()
+    for name in _cache_counts:
+        _cache_counts[name] = 0
@@ -0,0 +1,122 @@
+import functools
+import logging
+import time
+from collections import namedtuple
+
+from . import atomic, log, stats
+from .manifest import make_record, stamp_input
+from .Ytdl_nfo import Ytdl_nfo
+
+logger = logging.getLogger(__name__)
+
+# Number of files handed to a worker per round trip
+CHUNKSIZE = 32
+
+# Conversion statuses
+WRITTEN = "written"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+# Outcome of converting one file, with the kind of error for failures.
+# Workers also return the statistics and log records they collected, and the
+# files they staged for a durable run, so the parent process can merge them.
+Result = namedtuple(
+    "Result",
+    ["path", "status", "record", "extractor", "error", "stats", "logs", "staged"],
+    defaults=[None] * 5,
+)
+
+
+def convert_file(
+    file_path,
+    extractor=None,
+    config_dir=None,
+    track=False,
+    hash_inputs=False,
+    entries=False,
+    targets=(),
+):
+    # Returns the conversion status and, when tracking, the manifest record
+    start = time.perf_counter()
+    stamp = None
+    if track:
+        # Files deleted or made unreadable since the scan fail on their own
+        try:
+            stamp = stamp_input(file_path, hash_inputs)
+        except OSError:
+            logger.error(
+                "Error: Failed to read file %s",
+                file_path,
+                extra={"path": file_path, "kind": "read"},
+            )
+            result = Result(file_path, FAILED, None, extractor, "read")
+            stats.file_done(file_path, extractor, FAILED, time.perf_counter() - start)
+            return result
+    file = Ytdl_nfo(
+        file_path,
+        extractor,
+        config_dir,
+        lazy=True,
+        projected=True,
+        entries=entries,
+        targets=targets,
+    )
+    if not file.process():
+        result = Result(file_path, FAILED, None, file.extractor, file.failure)
+    else:
+        record = make_record(file, stamp) if track else None
+        result = Result(file_path, WRITTEN if file.written else UNCHANGED, record, file.extractor)
+    stats.file_done(file_path, file.extractor, result.status, time.perf_counter() - start)
+    return result
+
+
+def _convert_in_worker(file_path, collect_stats, stage, **kwargs):
+    if collect_stats:
+        stats.enable()
+    if stage and atomic.staging is None:
+        atomic.enable()
+    try:
+        result = convert_file(file_path, **kwargs)
+    finally:
+        collector = stats.disable() if collect_stats else None
+    return result._replace(stats=collector, logs=log.drain(), staged=atomic.drain())
+
+
+def run_parallel(
+    file_paths,
+    jobs,
+    extractor=None,
+    config_dir=None,
+    track=False,
+    hash_inputs=False,
+    ordered=True,
+    entries=False,
+    targets=(),
+):
+    # Workers are long lived, so each keeps its compiled configs cached
+    # across every chunk it processes
+    convert = functools.partial(
+        _convert_in_worker,
+        collect_stats=stats.current is not None,
+        stage=atomic.staging is not None,
+        extractor=extractor,
+        config_dir=config_dir,
+        track=track,
+        hash_inputs=hash_inputs,
+        entries=entries,
+        targets=targets,
+    )
+    import multiprocessing
+
+    level = log.logger.getEffectiveLevel()
+    with multiprocessing.Pool(jobs, log.init_worker, (level,)) as pool:
+        results = pool.imap if ordered else pool.imap_unordered
+        for result in results(convert, file_paths, CHUNKSIZE):
+            if result.stats is not None:
+                stats.current.merge(result.stats)
+                result = result._replace(stats=None)
+            if result.logs is not None:
+                log.replay(result.logs)
+                result = result._replace(logs=None)
+            yield result
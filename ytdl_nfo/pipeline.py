@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from . import stats
+from .manifest import Stamp, make_record
+from .nfo import write_if_changed
+from .parallel import FAILED, UNCHANGED, WRITTEN, Result
+from .Ytdl_nfo import Ytdl_nfo
+
+logger = logging.getLogger(__name__)
+
+# Reads and writes in flight on each mounted filesystem
+IO_CONCURRENCY = 16
+
+# Files between the scanner and the consumer of the results
+QUEUE_SIZE = 256
+
+_Done = namedtuple("_Done", ["error"])
+
+
+def run_pipeline(
+    file_paths,
+    io_concurrency=IO_CONCURRENCY,
+    extractor=None,
+    config_dir=None,
+    track=False,
+    hash_inputs=False,
+    queue_size=QUEUE_SIZE,
+    targets=(),
+):
+    # Reads and writes run on a thread pool per mount while decoding and
+    # rendering stay on the event loop, so network filesystems are kept busy
+    # instead of paying their latency once per file. Results arrive in
+    # completion order.
+    loop = asyncio.new_event_loop()
+    pipeline = _Pipeline(loop, io_concurrency, extractor, config_dir, track, hash_inputs, targets)
+    results = asyncio.Queue(queue_size)
+    feeder = loop.create_task(pipeline.feed(file_paths, results, queue_size))
+    try:
+        while True:
+            result = loop.run_until_complete(results.get())
+            if isinstance(result, _Done):
+                if result.error is not None:
+                    raise result.error
+                return
+            yield result
+    finally:
+        pipeline.tasks.add(feeder)
+        for task in pipeline.tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pipeline.tasks, return_exceptions=True))
+        pipeline.close()
+        loop.close()
+
+
+class _Pipeline:
+    def __init__(self, loop, io_concurrency, extractor, config_dir, track, hash_inputs, targets):
+        self.loop = loop
+        self.io_concurrency = io_concurrency
+        self.extractor = extractor
+        self.config_dir = config_dir
+        self.track = track
+        self.hash_inputs = hash_inputs
+        self.targets = targets
+        self.tasks = set()
+        self.error = None
+        # Scanning and mount lookups, then one pool per st_dev
+        self.scan_pool = ThreadPoolExecutor(1, thread_name_prefix="ytdl_nfo-scan")
+        self.pools = {}
+        self.devices = {}
+
+    def close(self):
+        self.scan_pool.shutdown()
+        for pool in self.pools.values():
+            pool.shutdown()
+
+    async def feed(self, file_paths, results, queue_size):
+        try:
+            in_flight = asyncio.Semaphore(queue_size)
+            file_paths = iter(file_paths)
+            while self.error is None:
+                await in_flight.acquire()
+                file_path = await self.loop.run_in_executor(self.scan_pool, next, file_paths, None)
+                if file_path is None:
+                    break
+                pool = await self._pool_for(file_path)
+                task = self.loop.create_task(self.convert(file_path, pool, results, in_flight))
+                self.tasks.add(task)
+                task.add_done_callback(self._task_done)
+            await asyncio.gather(*self.tasks)
+            if self.error is not None:
+                raise self.error
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await results.put(_Done(e))
+        else:
+            await results.put(_Done(None))
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None and self.error is None:
+            self.error = task.exception()
+
+    async def convert(self, file_path, pool, results, in_flight):
+        try:
+            await self._convert(file_path, pool, results)
+        finally:
+            in_flight.release()
+
+    async def _convert(self, file_path, pool, results):
+        start = time.perf_counter()
+        stamp, raw = await self.loop.run_in_executor(
+            pool, _read_input, file_path, self.track, self.hash_inputs
+        )
+        file = Ytdl_nfo(
+            file_path,
+            self.extractor,
+            self.config_dir,
+            lazy=True,
+            projected=True,
+            targets=self.targets,
+        )
+        outputs = None
+        if raw is None:
+            file.failure = "read"
+        elif file.load(raw) and file.generate():
+            outputs = [(nfo_path, nfo.serialize()) for nfo_path, nfo in file.outputs()]
+
+        if outputs is None:
+            result = Result(file_path, FAILED, None, file.extractor, file.failure)
+        else:
+            written = await self.loop.run_in_executor(pool, _write_outputs, outputs)
+            record = make_record(file, stamp) if self.track else None
+            result = Result(file_path, WRITTEN if written else UNCHANGED, record, file.extractor)
+        stats.file_done(file_path, file.extractor, result.status, time.perf_counter() - start)
+
+        await results.put(result)
+
+    async def _pool_for(self, file_path):
+        directory = os.path.dirname(file_path)
+        device = self.devices.get(directory)
+        if device is None:
+            device = await self.loop.run_in_executor(self.scan_pool, _device, directory)
+            self.devices[directory] = device
+        pool = self.pools.get(device)
+        if pool is None:
+            pool = ThreadPoolExecutor(self.io_concurrency, thread_name_prefix="ytdl_nfo-io")
+            self.pools[device] = pool
+        return pool
+
+
+def _device(directory):
+    try:
+        return os.stat(directory or ".").st_dev
+    except OSError:
+        return None
+
+
+def _write_outputs(outputs):
+    return any([write_if_changed(nfo_path, data) for nfo_path, data in outputs])
+
+
+def _read_input(file_path, track, hash_inputs):
+    # The manifest stamp comes from the open file, so hashing needs no second read
+    try:
+        with stats.timer("read"):
+            with open(file_path, "rb") as f:
+                st = os.fstat(f.fileno()) if track else None
+                raw = f.read()
+    except OSError:
+        logger.error(
+            "Error: Failed to read file %s", file_path, extra={"path": file_path, "kind": "read"}
+        )
+        return None, None
+    stats.add_bytes("read", len(raw))
+
+    stamp = None
+    if track:
+        input_hash = hashlib.sha256(raw).hexdigest() if hash_inputs else None
+        stamp = Stamp(st.st_size, st.st_mtime_ns, input_hash)
+    return stamp, raw
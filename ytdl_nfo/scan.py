@@ -0,0 +1,127 @@
+import fnmatch
+import hashlib
+import logging
+import os
+import re
+from collections import namedtuple
+
+from . import stats
+
+logger = logging.getLogger(__name__)
+
+# Directories NAS systems, desktops and downloaders keep their own files in
+PRUNE = ("@eaDir", ".Trash", ".Trash-*", ".Trashes", "#recycle", "#snapshot", ".@__thumb")
+
+# A JSON file found by the scanner and the names of all entries next to it,
+# so existing NFOs can be looked up without another stat
+Found = namedtuple("Found", ["path", "names"])
+
+# One of count independent runs over the same tree, counting index from 0.
+# Files are assigned by a hash of their path relative to the scanned
+# directory, or of the top level directory they are in when by is
+# "directory", so every run over the tree agrees without coordination.
+Shard = namedtuple("Shard", ["index", "count", "by"])
+
+
+class Scanner:
+    def __init__(
+        self, include=r".json$", exclude=(), prune=PRUNE, follow_symlinks=False, shard=None
+    ):
+        self.include = re.compile(include)
+        # Kept apart, as joined patterns could not use global inline flags like (?i)
+        self.exclude = tuple(re.compile(pattern) for pattern in exclude)
+        self.prune = _union([fnmatch.translate(pattern) for pattern in prune])
+        self.follow_symlinks = follow_symlinks
+        self.shard = shard
+
+    def accept(self, file_name):
+        if file_name.endswith(".live_chat.json"):
+            return False
+        if any(pattern.search(file_name) for pattern in self.exclude):
+            return False
+        return self.include.search(file_name) is not None
+
+    def pruned(self, dir_name):
+        return self.prune is not None and self.prune.match(dir_name) is not None
+
+    def in_shard(self, rel_path):
+        # rel_path is relative to the scanned directory, with / separators
+        if self.shard is None:
+            return True
+        if self.shard.by == "directory":
+            rel_path = rel_path.split("/", 1)[0]
+        digest = hashlib.blake2b(os.fsencode(rel_path), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.shard.count == self.shard.index
+
+    def scan(self, top):
+        # Directories are keyed by device and inode so symlink and bind mount
+        # loops are entered once. Files are only deduplicated when following
+        # symlinks; hard links in separate directories each get their NFO.
+        seen_dirs = set()
+        seen_files = set()
+        # Relative paths are only tracked for sharding. Top level directories
+        # of other shards are not walked when sharding by directory.
+        shard_paths = self.shard is not None and self.shard.by == "path"
+        stack = [(top, "")]
+        while stack:
+            root, rel = stack.pop()
+            try:
+                with stats.timer("walk"):
+                    root_stat = os.stat(root)
+                    with os.scandir(root) as it:
+                        entries = list(it)
+            except OSError as e:
+                logger.error("Error: Failed to read directory %s: %s", root, e.strerror)
+                continue
+            if (root_stat.st_dev, root_stat.st_ino) in seen_dirs:
+                continue
+            seen_dirs.add((root_stat.st_dev, root_stat.st_ino))
+
+            names = frozenset(entry.name for entry in entries)
+            sub_dirs = []
+            at_top = rel == ""
+            for entry in entries:
+                rel_path = None
+                if shard_paths or (at_top and self.shard is not None):
+                    rel_path = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                        if not self.pruned(entry.name):
+                            if shard_paths or not at_top or self.in_shard(rel_path):
+                                sub_dirs.append((entry.path, rel_path))
+                        continue
+                    if not entry.is_file() or not self.accept(entry.name):
+                        continue
+                    if rel_path is not None and not self.in_shard(rel_path):
+                        continue
+                    if self.follow_symlinks:
+                        key = self._file_key(entry, root_stat.st_dev)
+                        if key in seen_files:
+                            continue
+                        seen_files.add(key)
+                except OSError:
+                    continue
+                yield Found(entry.path, names)
+
+            # Same top-down order as os.walk
+            stack.extend(reversed(sub_dirs))
+
+    @staticmethod
+    def _file_key(entry, dev):
+        # The inode of a plain directory entry comes with the listing
+        if entry.is_symlink():
+            st = entry.stat()
+            return st.st_dev, st.st_ino
+        return dev, entry.inode()
+
+
+def nfo_exists(nfo_path, found):
+    if os.path.dirname(nfo_path) == os.path.dirname(found.path):
+        return os.path.basename(nfo_path) in found.names
+    return os.path.exists(nfo_path)
+
+
+def _union(patterns):
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
@@ -0,0 +1,272 @@
+import bisect
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Run statistics. Instrumented code calls the module level helpers, which do
+# nothing unless a collector was enabled for the current process.
+
+# Upper bounds, in seconds, of the timing histogram buckets (10us to 100s)
+BUCKETS = tuple(round(10 ** (exponent / 4), 9) for exponent in range(-20, 9))
+
+current = None
+
+# Guards the collector when I/O threads record timings and byte counts
+_lock = threading.Lock()
+
+
+def enable(top_n=10):
+    global current
+    current = Stats(top_n)
+    return current
+
+
+def disable():
+    global current
+    collector, current = current, None
+    return collector
+
+
+def timer(stage):
+    if current is None:
+        return _NULL_TIMER
+    return _Timer(current, stage)
+
+
+def add_bytes(kind, count):
+    if current is not None:
+        with _lock:
+            current.bytes[kind] += count
+
+
+def file_done(file_path, extractor, status, seconds=None):
+    if current is not None:
+        with _lock:
+            current.file_done(file_path, extractor, status, seconds)
+
+
+class Stats:
+    def __init__(self, top_n=10):
+        self.top_n = top_n
+        self.stages = defaultdict(_Histogram)
+        self.files = defaultdict(Counter)
+        self.bytes = Counter()
+        self.slowest = []
+        self.started = time.time()
+        self.elapsed = None
+        self.config_cache = {}
+        self.json_backend = None
+
+    def observe(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def file_done(self, file_path, extractor, status, seconds=None):
+        self.files[extractor or "unknown"][status] += 1
+        if seconds is not None:
+            self.observe("file", seconds)
+            self._keep_slowest((seconds, file_path))
+
+    def merge(self, other):
+        for stage, histogram in other.stages.items():
+            self.stages[stage].merge(histogram)
+        for extractor, counts in other.files.items():
+            self.files[extractor].update(counts)
+        self.bytes.update(other.bytes)
+        for item in other.slowest:
+            self._keep_slowest(item)
+
+    def finish(self, config_cache=None, json_backend=None):
+        self.elapsed = time.time() - self.started
+        self.json_backend = json_backend
+        if config_cache is not None:
+            self.config_cache = config_cache._asdict()
+
+    def as_dict(self):
+        totals = Counter()
+        for counts in self.files.values():
+            totals.update(counts)
+        return {
+            "started": self.started,
+            "elapsed": self.elapsed,
+            "files": dict(totals),
+            "extractors": {name: dict(counts) for name, counts in sorted(self.files.items())},
+            "bytes": dict(self.bytes),
+            "config_cache": self.config_cache,
+            "json_backend": self.json_backend,
+            "stages": {name: self.stages[name].summary() for name in sorted(self.stages)},
+            "slowest": [
+                {"path": path, "seconds": seconds} for seconds, path in sorted(self.slowest)[::-1]
+            ],
+        }
+
+    def to_json(self):
+        import json
+
+        return json.dumps(self.as_dict(), indent=2)
+
+    def to_text(self):
+        report = self.as_dict()
+        lines = [f"Run took {report['elapsed'] or 0:.2f}s"]
+        lines.append("Files: " + _counts(report["files"]))
+        for name, counts in report["extractors"].items():
+            lines.append(f"  {name}: {_counts(counts)}")
+        lines.append(
+            f"Bytes: {report['bytes'].get('read', 0)} read, "
+            f"{report['bytes'].get('written', 0)} written"
+        )
+        if self.config_cache:
+            lines.append("Config cache: " + _counts(self.config_cache))
+        if self.json_backend:
+            lines.append(f"JSON backend: {self.json_backend}")
+
+        header = ["count", "total", "mean", "p50", "p90", "p99", "max"]
+        lines.append(f"{'Stage':<10} {header[0]:>8} " + " ".join(f"{h:>9}" for h in header[1:]))
+        for name, summary in report["stages"].items():
+            values = [summary[key] for key in ("total", "mean", "p50", "p90", "p99", "max")]
+            lines.append(
+                f"{name:<10} {summary['count']:>8} " + " ".join(f"{v:>8.4f}s" for v in values)
+            )
+
+        if report["slowest"]:
+            lines.append("Slowest files:")
+            lines.extend(f"  {item['seconds']:.4f}s {item['path']}" for item in report["slowest"])
+        return "\n".join(lines)
+
+    def to_prometheus(self):
+        # Text exposition format for node_exporter's textfile collector
+        lines = [
+            "# HELP ytdl_nfo_files Files handled by the last run",
+            "# TYPE ytdl_nfo_files gauge",
+        ]
+        for extractor, counts in sorted(self.files.items()):
+            for status, count in sorted(counts.items()):
+                labels = f'extractor="{_label(extractor)}",status="{status}"'
+                lines.append(f"ytdl_nfo_files{{{labels}}} {count}")
+
+        lines += ["# HELP ytdl_nfo_bytes Bytes read and written", "# TYPE ytdl_nfo_bytes gauge"]
+        for kind, count in sorted(self.bytes.items()):
+            lines.append(f'ytdl_nfo_bytes{{kind="{kind}"}} {count}')
+
+        lines += [
+            "# HELP ytdl_nfo_config_cache Config cache lookups in the main process",
+            "# TYPE ytdl_nfo_config_cache gauge",
+        ]
+        for kind, count in sorted(self.config_cache.items()):
+            lines.append(f'ytdl_nfo_config_cache{{kind="{kind}"}} {count}')
+
+        lines += [
+            "# HELP ytdl_nfo_stage_seconds Time spent per stage",
+            "# TYPE ytdl_nfo_stage_seconds histogram",
+        ]
+        for name in sorted(self.stages):
+            histogram = self.stages[name]
+            cumulative = 0
+            metric = "ytdl_nfo_stage_seconds"
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.total}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+
+        if self.json_backend:
+            lines += [
+                "# HELP ytdl_nfo_json_backend_info JSON decoder used by the last run",
+                "# TYPE ytdl_nfo_json_backend_info gauge",
+                f'ytdl_nfo_json_backend_info{{backend="{self.json_backend}"}} 1',
+            ]
+
+        lines += [
+            "# HELP ytdl_nfo_last_run_timestamp_seconds Start time of the last run",
+            "# TYPE ytdl_nfo_last_run_timestamp_seconds gauge",
+            f"ytdl_nfo_last_run_timestamp_seconds {self.started}",
+            "# HELP ytdl_nfo_last_run_duration_seconds Duration of the last run",
+            "# TYPE ytdl_nfo_last_run_duration_seconds gauge",
+            f"ytdl_nfo_last_run_duration_seconds {self.elapsed or 0}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _keep_slowest(self, item):
+        if len(self.slowest) < self.top_n:
+            heapq.heappush(self.slowest, item)
+        elif self.slowest and item > self.slowest[0]:
+            heapq.heapreplace(self.slowest, item)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the percentile, capped at the maximum
+        target = fraction * self.count
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class _Timer:
+    __slots__ = ("stats", "stage", "start")
+
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            self.stats.observe(self.stage, elapsed)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _counts(counts):
+    return ", ".join(f"{count} {status}" for status, count in sorted(counts.items())) or "none"
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
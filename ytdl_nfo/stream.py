@@ -0,0 +1,203 @@
+import json
+import mmap
+import os
+import re
+
+from .jsonload import loads
+
+# Streaming access to large playlist and channel info.json files.
+#
+# The file is memory mapped and walked at the byte level: every top level
+# member except entries is sliced out and decoded on its own, while entries
+# is only skipped over. Entries are then decoded one at a time on request,
+# so peak memory is bounded by the largest member instead of the file.
+#
+# The same walk projects ordinary info.json files: scalars are decoded,
+# containers (formats, thumbnails, automatic_captions, ...) are only
+# delimited, and decoded later if the config turns out to reference them.
+
+# Inputs at least this large are streamed instead of read into memory
+STREAM_SIZE = 32 * 1024 * 1024
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRING = re.compile(rb'"(?:[^"\\]++|\\.)*+"', re.S)
+_SCALAR = re.compile(rb"[^,:\[\]{}\s]+")
+# Everything up to and including the next bracket outside a string
+_BRACKET = re.compile(rb'(?:[^"\[\]{}]++|"(?:[^"\\]++|\\.)*+")*+[\[\]{}]', re.S)
+_OPEN = frozenset(b"[{")
+
+
+def _nested(depth):
+    # A container nested at most depth levels deep, matched by one regex
+    # call instead of a step per bracket. Brackets are not paired by kind,
+    # decoding the slice validates it.
+    string = rb'"[^"\\]*+(?:\\.[^"\\]*+)*+"'
+    plain = rb'[^"\[\]{}]*+'
+    value = string
+    for _ in range(depth):
+        container = rb"[\[{]" + plain + rb"(?:(?:" + value + rb")" + plain + rb")*+[\]}]"
+        value = string + rb"|" + container
+    return re.compile(container, re.S)
+
+
+# Deeper containers are walked bracket by bracket
+_CONTAINER = _nested(8)
+
+# Parsed pages are dropped from the mapping in steps of this many bytes
+_RELEASE_SIZE = 16 * 1024 * 1024
+
+
+class Playlist:
+    def __init__(self, f):
+        # Maps an open binary file, which may be closed once this returns
+        self.size = os.fstat(f.fileno()).st_size
+        self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.entries_span = None
+        self.released = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+
+    def entries(self):
+        if self.entries_span is None:
+            return
+        buf = self.buf
+        pos = _skip_whitespace(buf, self.entries_span[0] + 1)
+        if buf[pos : pos + 1] == b"]":
+            return
+        self.released = 0
+        while True:
+            end = _skip(buf, pos)
+            entry = loads(buf[pos:end])
+            self._release(end)
+            yield entry
+            pos = _skip_whitespace(buf, end)
+            if buf[pos : pos + 1] == b"]":
+                return
+            pos = _skip_whitespace(buf, _expect(buf, pos, b",", "Expecting ',' delimiter"))
+
+    def load_entries(self):
+        # Materialize entries, for configs that reference them
+        return list(self.entries())
+
+    def _release(self, pos):
+        # Clean file pages would be reclaimed anyway, dropping them keeps the
+        # resident size bounded as well
+        if pos - self.released < _RELEASE_SIZE or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        end = pos - pos % mmap.PAGESIZE
+        self.buf.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+        self.released = end
+
+    def read_fields(self):
+        # Decode every top level member except entries
+        buf = self.buf
+        data = {}
+        for key, start, end in _members(buf, self._release):
+            if key == "entries" and buf[start : start + 1] == b"[":
+                self.entries_span = (start, end)
+            else:
+                data[key] = loads(buf[start:end])
+        return data
+
+
+def read_members(buf):
+    # Returns (data, spans) for the JSON object in buf: scalars decoded, and
+    # the (start, end) of containers, which are delimited but not validated
+    data = {}
+    spans = {}
+    for key, start, end in _members(buf):
+        if buf[start] in _OPEN:
+            spans[key] = (start, end)
+            data.pop(key, None)
+        else:
+            data[key] = json.loads(buf[start:end])
+            spans.pop(key, None)
+    return data, spans
+
+
+def decode_spans(buf, spans, fields):
+    # Decode the delimited containers that turned out to be needed
+    return {key: loads(buf[slice(*spans[key])]) for key in fields if key in spans}
+
+
+def _members(buf, release=None):
+    # Yields (key, start, end) for every member of the top level object
+    pos = _expect(buf, _skip_whitespace(buf, 0), b"{", "Expecting value")
+    pos = _skip_whitespace(buf, pos)
+    if buf[pos : pos + 1] == b"}":
+        _expect_end(buf, pos + 1)
+        return
+
+    while True:
+        match = _STRING.match(buf, pos)
+        if match is None:
+            _fail(pos, "Expecting property name enclosed in double quotes")
+        key = json.loads(match.group())
+        pos = _skip_whitespace(buf, match.end())
+        start = _skip_whitespace(buf, _expect(buf, pos, b":", "Expecting ':' delimiter"))
+        end = _skip(buf, start, release)
+        yield key, start, end
+
+        pos = _skip_whitespace(buf, end)
+        if buf[pos : pos + 1] == b"}":
+            _expect_end(buf, pos + 1)
+            return
+        pos = _skip_whitespace(buf, _expect(buf, pos, b",", "Expecting ',' delimiter"))
+
+
+def _skip(buf, pos, release=None):
+    # End of the JSON value starting at pos. Values are only delimited here,
+    # decoding the slice validates them. release is told the end of each
+    # element of a container as it is passed.
+    first = buf[pos : pos + 1]
+    if first == b'"':
+        match = _STRING.match(buf, pos)
+        if match is None:
+            _fail(pos, "Unterminated string starting at")
+        return match.end()
+    if first and first[0] in _OPEN:
+        if release is None:
+            match = _CONTAINER.match(buf, pos)
+            if match is not None:
+                return match.end()
+        depth = 0
+        for match in _BRACKET.finditer(buf, pos):
+            depth += 1 if buf[match.end() - 1] in _OPEN else -1
+            if depth == 0:
+                return match.end()
+            if depth == 1 and release is not None:
+                release(match.end())
+        _fail(pos, "Unterminated container starting at")
+    match = _SCALAR.match(buf, pos)
+    if match is None:
+        _fail(pos, "Expecting value")
+    return match.end()
+
+
+def _skip_whitespace(buf, pos):
+    return _WHITESPACE.match(buf, pos).end()
+
+
+def _expect(buf, pos, char, msg):
+    if buf[pos : pos + 1] != char:
+        _fail(pos, msg)
+    return pos + 1
+
+
+def _expect_end(buf, pos):
+    pos = _skip_whitespace(buf, pos)
+    if pos != len(buf):
+        _fail(pos, "Extra data")
+
+
+def _fail(pos, msg):
+    # The document is not held as a str, so errors only carry the byte offset
+    raise json.JSONDecodeError(msg, "", pos)
@@ -0,0 +1,238 @@
+import ctypes
+import logging
+import os
+import select
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")
+
+# Seconds between scans when inotify is not available
+POLL_INTERVAL = 10.0
+
+
+class Watcher:
+    """Convert JSON files as they are written below a directory.
+
+    Changes are collected from inotify, or by rescanning the tree when
+    inotify is unavailable or polling was requested (e.g. on NFS/SMB where
+    remote writes raise no events). A file is only converted once it has
+    not changed for ``settle`` seconds, so partial writes are never read.
+    Directories whose name ``pruned`` matches are neither watched nor
+    scanned, and symlinked directories are only followed when asked.
+    """
+
+    def __init__(
+        self,
+        top,
+        accept,
+        convert,
+        settle=2.0,
+        poll_interval=None,
+        pruned=None,
+        follow_symlinks=False,
+    ):
+        self.top = top
+        self.accept = accept
+        self.convert = convert
+        self.settle = settle
+        self.pruned = pruned or _never
+        self.pending = {}
+
+        walk = _Walk(self.pruned, follow_symlinks)
+        self.source = None
+        if poll_interval is None:
+            self.source = _InotifySource.create(top, walk)
+        if self.source is None:
+            self.source = _PollSource(top, accept, poll_interval or POLL_INTERVAL, walk)
+
+    def run(self):
+        while True:
+            self.step()
+
+    def step(self, timeout=None):
+        # Wait for changes at most until the next pending file settles
+        if self.pending:
+            next_due = min(self.pending.values()) + self.settle - time.monotonic()
+            timeout = max(0.0, next_due if timeout is None else min(timeout, next_due))
+
+        for path in self.source.wait(timeout):
+            if self.accept(os.path.basename(path)) and not self._in_pruned(path):
+                self.pending[path] = time.monotonic()
+
+        now = time.monotonic()
+        due = sorted(path for path, changed in self.pending.items() if now - changed >= self.settle)
+        for path in due:
+            del self.pending[path]
+            if os.path.isfile(path):
+                self.convert(path)
+
+    def close(self):
+        self.source.close()
+
+    def _in_pruned(self, path):
+        # Watches are never placed in pruned directories, but one may have
+        # been renamed to a pruned name after it was watched
+        rel_dir = os.path.dirname(os.path.relpath(path, self.top))
+        return any(self.pruned(name) for name in rel_dir.split(os.sep) if name)
+
+
+def _never(name):
+    return False
+
+
+class _Walk:
+    # os.walk without pruned directories, entering each directory once so
+    # followed symlink loops end
+    def __init__(self, pruned, follow_symlinks):
+        self.pruned = pruned
+        self.follow_symlinks = follow_symlinks
+
+    def __call__(self, top):
+        seen = set()
+        for root, dirs, files in os.walk(top, followlinks=self.follow_symlinks):
+            if self.follow_symlinks:
+                try:
+                    st = os.stat(root)
+                except OSError:
+                    dirs[:] = []
+                    continue
+                if (st.st_dev, st.st_ino) in seen:
+                    dirs[:] = []
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+            dirs[:] = [name for name in dirs if not self.pruned(name)]
+            yield root, dirs, files
+
+
+class _InotifySource:
+    def __init__(self, libc, fd, top, walk):
+        self.libc = libc
+        self.fd = fd
+        self.walk = walk
+        self.dirs = {}
+        self.changed = []
+        self._add_tree(top, existing=False)
+
+    @classmethod
+    def create(cls, top, walk):
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            init = libc.inotify_init1
+        except (OSError, AttributeError):
+            return None
+        fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        return cls(libc, fd, top, walk)
+
+    def wait(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            self._read_events()
+        changed, self.changed = self.changed, []
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+    def _read_events(self):
+        while True:
+            try:
+                buf = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _, length = _EVENT.unpack_from(buf, pos)
+                pos += _EVENT.size
+                name = os.fsdecode(buf[pos : pos + length].rstrip(b"\0"))
+                pos += length
+                self._handle(wd, mask, name)
+
+    def _handle(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            logger.warning("Warning: Watch event queue overflowed, some files may have been missed")
+            return
+        if mask & IN_IGNORED:
+            self.dirs.pop(wd, None)
+            return
+
+        directory = self.dirs.get(wd)
+        if directory is None or not name:
+            return
+        path = os.path.join(directory, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO) and not self.walk.pruned(name):
+                self._add_tree(path)
+        else:
+            self.changed.append(path)
+
+    def _add_tree(self, top, existing=True):
+        for root, dirs, files in self.walk(top):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), _WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                logger.error("Error: Failed to watch %s: %s", root, os.strerror(err))
+                continue
+            self.dirs[wd] = root
+            # Files in new directories may appear before the watch is in place
+            if existing:
+                self.changed.extend(os.path.join(root, file_name) for file_name in files)
+
+
+class _PollSource:
+    def __init__(self, top, accept, interval, walk):
+        self.top = top
+        self.accept = accept
+        self.interval = interval
+        self.walk = walk
+        self.snapshot = self._scan()
+        self.next_scan = time.monotonic() + interval
+
+    def wait(self, timeout=None):
+        delay = self.next_scan - time.monotonic()
+        if timeout is not None and timeout < delay:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, delay))
+        self.next_scan = time.monotonic() + self.interval
+
+        snapshot = self._scan()
+        changed = [
+            path for path, stamp in snapshot.items() if self.snapshot.get(path) != stamp
+        ]
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+    def _scan(self):
+        snapshot = {}
+        for root, dirs, files in self.walk(self.top):
+            for file_name in files:
+                if not self.accept(file_name):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot